@@ -0,0 +1,235 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks every registry query and page loader against generated data at
+# several multiples of the real volume. The pages and the embedded DuckDB
+# engine run on a snapshot of the generated store; Postgres queries only run
+# with --dsn, which must name a scratch database as its tables are replaced.
+#
+#   python -m benchmarks.run --scales 1 10 --save-baseline
+#   python -m benchmarks.run --scales 1 10 --dsn postgresql://localhost/ipl_bench
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# A p95 slower than baseline by this factor, and by at least MIN_REGRESSION_MS, fails the run
+REGRESSION_FACTOR = 1.25
+MIN_REGRESSION_MS = 1.0
+MATCH_FIGURES = ['run_progression', 'phase_runs', 'worm_chart', 'partnership',
+                 'economy', 'dismissals', 'wickets', 'moments']
+
+
+def measure(fn, repeat, setup=None):
+    # Latency over `repeat` cold calls, then one more call under tracemalloc
+    # for peak memory, so tracing overhead never skews the timings
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def _busiest(store):
+    # The entities with the most data behind them are the slowest pages
+    matches, deliveries = store.matches, store.deliveries
+    teams = np.bincount(np.concatenate([matches['team_1'], matches['team_2']]))
+    venues = np.bincount(matches['venue'])
+    batters = np.bincount(deliveries['batter'])
+    return {
+        'team': store.vocabularies['teams'][teams.argmax()],
+        'venue': store.vocabularies['venues'][venues.argmax()],
+        'player': store.vocabularies['players'][batters.argmax()],
+        'match': int(matches['match_id'][-1]),
+    }
+
+
+def bench_pages(frames, repeat):
+    from utils import data_version as data_version_module
+    from utils import player_stats, team_stats, venue_stats
+    from utils.data_version import data_version, entity_version
+    from utils.engines import DuckDBEngine
+    from utils.db_connections import run_queries
+    from utils.leaderboards import get_leaderboards
+    from utils.match_analytics import get_match_analytics
+    from utils.player_index import PlayerIndex
+    from utils.snapshot import export_snapshot, load_snapshot
+    from utils.store import ColumnStore, get_store, _load_store
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="ipl-bench-") as directory:
+        results['store.from_frames'] = measure(
+            lambda: ColumnStore.from_frames(frames['deliveries'], frames['matches'],
+                                            frames['players']['player_name'], frames['teams']['team_name'],
+                                            frames['innings']),
+            max(1, repeat // 5))
+        store = ColumnStore.from_frames(frames['deliveries'], frames['matches'],
+                                        frames['players']['player_name'], frames['teams']['team_name'],
+                                        frames['innings'])
+        export_snapshot(store, directory)
+        results['store.load_snapshot'] = measure(lambda: load_snapshot(directory), repeat)
+        results['duckdb.load'] = measure(lambda: DuckDBEngine(directory), max(1, repeat // 5))
+        results.update(bench_engine(DuckDBEngine(directory), repeat))
+
+        # Point the app at this scale's snapshot and drop whatever the previous scale cached
+        os.environ["IPL_SNAPSHOT_DIR"] = directory
+        data_version_module._version = None
+        _load_store.clear()
+        store = get_store()
+        version = data_version()
+        entities = _busiest(store)
+
+        results['leaderboards'] = measure(lambda: get_leaderboards(version), repeat, setup=run_queries.clear)
+        results['player_index'] = measure(lambda: PlayerIndex(store), repeat)
+        for listing in (player_stats.load_players, team_stats.load_teams, venue_stats.load_venues):
+            results[f"{listing.__module__.split('.')[-1]}.{listing.__name__}"] = measure(
+                lambda: listing(version), repeat, setup=listing.clear)
+
+        for kind, module in (('player', player_stats), ('team', team_stats), ('venue', venue_stats)):
+            name = entities[kind]
+            results[f"entity_version.{kind}"] = measure(lambda: entity_version(kind, name), repeat)
+            entity = entity_version(kind, name)
+            for loader in module.loaders:
+                results[f"{kind}_stats.{loader.__name__}"] = measure(
+                    lambda: loader(name, entity), repeat, setup=loader.clear)
+
+        match_id = entities['match']
+        results['match_analytics'] = measure(
+            lambda: get_match_analytics(match_id, version), repeat, setup=get_match_analytics.clear)
+        results['match_figures'] = measure(
+            lambda: [get_match_analytics(match_id, version).figure(name) for name in MATCH_FIGURES],
+            repeat, setup=get_match_analytics.clear)
+
+        # Release the mapped files before the directory is removed
+        _load_store.clear()
+        os.environ.pop("IPL_SNAPSHOT_DIR", None)
+    return results
+
+
+def bench_engine(engine, repeat):
+    from utils.queries import registry
+
+    results = {}
+    for name, query in registry.items():
+        if query.params:
+            # Parameterised queries are covered through the page loaders
+            continue
+        run = engine.read_copy if query.schema else engine.execute
+        results[f"{engine.name}.{name}"] = measure(lambda: run(query, ()), repeat)
+    return results
+
+
+def bench_postgres(frames, dsn, repeat):
+    import psycopg2
+    from utils.db_connections import ConnectionPool
+    from utils.engines import PostgresEngine
+    from utils.synthetic import load_into_postgres
+
+    conn = psycopg2.connect(dsn)
+    try:
+        started = time.perf_counter()
+        load_into_postgres(conn, frames)
+        print(f"  loaded Postgres in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        conn.close()
+    pool = ConnectionPool(minconn=1, maxconn=1, dsn=dsn)
+    try:
+        return bench_engine(PostgresEngine(pool), repeat)
+    finally:
+        pool.closeall()
+
+
+def compare(results, baseline):
+    regressions = []
+    for scale, timings in results.items():
+        for name, current in timings.items():
+            previous = baseline.get(scale, {}).get(name)
+            if not previous:
+                continue
+            ratio = current['p95_ms'] / previous['p95_ms'] if previous['p95_ms'] else float('inf')
+            if ratio > REGRESSION_FACTOR and current['p95_ms'] - previous['p95_ms'] > MIN_REGRESSION_MS:
+                regressions.append((scale, name, previous['p95_ms'], current['p95_ms'], ratio))
+    return regressions
+
+
+def report(results, baseline):
+    rows = []
+    for scale, timings in results.items():
+        for name, r in timings.items():
+            previous = baseline.get(scale, {}).get(name, {}).get('p95_ms')
+            rows.append({'scale': scale, 'benchmark': name, **r,
+                         'baseline_p95_ms': previous,
+                         'change': round(r['p95_ms'] / previous, 2) if previous else None})
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark queries and page loaders on synthetic data")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dsn", help="scratch Postgres database to load and query; its tables are replaced")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    # Cached loaders run outside a Streamlit session here, which it warns about on every call
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+    from utils.synthetic import generate
+
+    results = {}
+    for scale in args.scales:
+        started = time.perf_counter()
+        frames = generate(scale=scale, seed=args.seed)
+        print(f"{scale}x: generated {len(frames['matches'])} matches, {len(frames['deliveries'])} deliveries "
+              f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        timings = bench_pages(frames, args.repeat)
+        if args.dsn:
+            timings.update(bench_postgres(frames, args.dsn, args.repeat))
+        results[f"{scale}x"] = timings
+        del frames
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        # Scales not run this time keep their previous baseline
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = compare(results, baseline)
+    for scale, name, before, after, ratio in regressions:
+        print(f"REGRESSION {scale} {name}: p95 {before:.1f}ms -> {after:.1f}ms ({ratio:.2f}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
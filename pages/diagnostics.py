@@ -0,0 +1,90 @@
+import os
+
+import streamlit as st
+import plotly.express as px
+from utils.instrumentation import recorder, LATENCY_BUCKETS_MS
+
+st.set_page_config(page_title="Diagnostics", layout="wide")
+
+# Only registered by streamlit_app.py for a session opened as
+# /diagnostics?token=<IPL_DIAGNOSTICS_TOKEN>; checked again here in case the
+# page is ever run on its own
+token = os.environ.get("IPL_DIAGNOSTICS_TOKEN")
+if not token or st.query_params.get("token") != token:
+    st.info("Nothing to see here.")
+    st.stop()
+
+st.title("🩺 Diagnostics")
+
+if st.button("Refresh"):
+    st.rerun()
+
+# Connection Usage
+st.markdown("## Query Engine")
+try:
+    from utils.engines import get_engine
+    engine_stats = get_engine().stats()
+except Exception as exc:
+    st.warning(f"No query engine: {exc}")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Engine", engine_stats['engine'])
+    col2.metric("In Use", f"{engine_stats['in_use']} / {engine_stats['max']}")
+    if 'idle' in engine_stats:
+        col3.metric("Idle Connections", f"{engine_stats['idle']} of {engine_stats['size']}")
+        col4.metric("Checkout Waits", engine_stats['waits'])
+
+st.markdown("---")
+
+events = recorder.events()
+st.caption(f"{len(events)} calls in the ring buffer")
+
+# Slowest Queries and Loaders
+st.markdown("## Slowest Calls (p95)")
+if events.empty:
+    st.info("No calls recorded yet.")
+else:
+    st.dataframe(recorder.slowest(20).round(2), use_container_width=True)
+
+    st.markdown("## Latency Distribution")
+    selected = st.selectbox("Query or Loader", sorted(events['name'].unique()))
+    histogram = recorder.histograms()[selected]
+    labels = [f"≤{edge}ms" for edge in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    fig = px.bar(x=labels, y=histogram['counts'], labels={'x': 'Latency', 'y': 'Calls'})
+    st.plotly_chart(fig, use_container_width=True)
+
+st.markdown("---")
+
+# Shared Result Cache
+st.markdown("## Shared Result Cache")
+try:
+    from utils.result_cache import get_result_cache
+    result_cache = get_result_cache()
+    cache_stats = result_cache.stats()
+except Exception as exc:
+    st.warning(f"No result cache: {exc}")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Entries", cache_stats['entries'])
+    col2.metric("Size", f"{cache_stats['bytes'] / 2**20:.1f} / {cache_stats['budget_bytes'] / 2**20:.0f} MB")
+    col3.metric("Hit Ratio (all replicas)", cache_stats['hit_ratio'] if cache_stats['hit_ratio'] is not None else "-")
+    col4.metric("Evictions", cache_stats['evictions'])
+    st.dataframe(result_cache.counters(), use_container_width=True)
+    st.caption(cache_stats['path'])
+
+# Cache Hit Ratios
+st.markdown("## Cache Hit Ratios (this replica)")
+ratios = recorder.cache_ratios()
+if ratios.empty:
+    st.info("No cached calls recorded yet.")
+else:
+    st.dataframe(ratios.sort_values('hit_ratio'), use_container_width=True)
+
+st.markdown("---")
+
+# Recent Calls
+st.markdown("## Recent Calls")
+st.dataframe(events.tail(200).iloc[::-1], use_container_width=True)
+
+st.download_button("Export Histograms (JSON)", recorder.export(), file_name="query_histograms.json",
+                   mime="application/json")
@@ -3,24 +3,18 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import psycopg2
-from utils.db_connections import get_connection
-from utils.plot_utils import plot_run_progression, plot_worm_chart, plot_phase_runs
+from utils.match_analytics import get_match_analytics, load_matches
+from utils.data_version import data_version, entity_version
+from utils.plot_utils import overlay_win_probability
+from utils.win_probability import win_probability
 
 st.set_page_config(page_title="Match Analysis", page_icon="⚔️", layout="wide")
 
 st.title("⚔️ Match Analysis")
 st.markdown("Deep Dive into individual IPL matches")
 
-# Database Connection
-conn = get_connection()
-
 # Load Match List
-@st.cache_data
-def load_matches():
-    query = "SELECT match_id, season, match_date, team_1, team_2, winner FROM  public.matches ORDER BY match_date DESC"
-    return pd.read_sql(query, conn)
-
-matches = load_matches()
+matches = load_matches(data_version())
 
 match_list = matches.apply(lambda x: f"{x['season']} - {x['team_1']} vs {x['team_2']} ({x['match_date']})", axis=1)
 selected_match = st.selectbox("Select a Match", match_list)
@@ -28,15 +22,8 @@ selected_match = st.selectbox("Select a Match", match_list)
 match_id = matches.loc[match_list == selected_match, "match_id"].values[0]
 
 # Load Selected Match Data
-@st.cache_data
-def load_match_data(match_id):
-    deliveries_query = f"SELECT * FROM  public.deliveries WHERE match_id = {match_id} ORDER BY inning, over_number, ball_number"
-    deliveries = pd.read_sql(deliveries_query, conn)
-    match_info_query = f"SELECT * FROM  public.matches WHERE match_id = {match_id}"
-    match_info = pd.read_sql(match_info_query, conn).iloc[0]
-    return deliveries, match_info
-
-deliveries, match_info = load_match_data(match_id)
+analytics = get_match_analytics(int(match_id), entity_version('match', int(match_id)))
+match_info = analytics.match_info
 
 # Match Overview
 st.subheader(f"{match_info['team_1']} vs {match_info['team_2']}")
@@ -46,59 +33,38 @@ st.markdown(f"**Player of the Match:** {match_info['player_of_match']}")
 
 st.markdown("---")
 
-# Tabs
-tab1, tab2, tab3, tab4 = st.tabs(["Run Progression", "Over Phase Analysis", "Worm Chart", "Advanced Analysis"])
+# Tabs - only the selected one is computed and rendered
+tab = st.radio("View", ["Run Progression", "Over Phase Analysis", "Worm Chart", "Advanced Analysis"],
+               horizontal=True, label_visibility="collapsed")
 
-# Tab 1 - Run Progression
-with tab1:
-    st.plotly_chart(plot_run_progression(deliveries), use_container_width=True)
+if tab == "Run Progression":
+    st.plotly_chart(analytics.figure('run_progression'), use_container_width=True)
 
-# Tab 2 - Over Phase Analysis
-with tab2:
-    st.plotly_chart(plot_phase_runs(deliveries), use_container_width=True)
+elif tab == "Over Phase Analysis":
+    st.plotly_chart(analytics.figure('phase_runs'), use_container_width=True)
 
-# Tab 3 - Worm Chart
-with tab3:
-    st.plotly_chart(plot_worm_chart(deliveries), use_container_width=True)
+elif tab == "Worm Chart":
+    fig = analytics.figure('worm_chart')
+    if st.toggle("Overlay win probability", value=True):
+        curve = win_probability(int(match_id), data_version())
+        fig = overlay_win_probability(fig, curve)
+    st.plotly_chart(fig, use_container_width=True)
 
-# Tab 4 - Advanced Analysis
-with tab4:
+else:
     st.header("Partnership Runs")
-    partnership = deliveries.groupby(['inning', 'batter', 'non_striker'])['runs_batter'].sum().reset_index()
-    partnership['partnership'] = partnership['batter'] + " & " + partnership['non_striker']
-    fig = px.bar(partnership, x='partnership', y='runs_batter', color='inning',
-                 labels={'runs_batter': 'Runs Scored', 'partnership': 'Partnership'})
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(analytics.figure('partnership'), use_container_width=True)
 
     st.header("Bowler Economy Heatmap")
-    economy = deliveries.groupby('bowler')['runs_total'].sum() / deliveries.groupby('bowler')['ball_number'].count()
-    economy = economy.reset_index(name='economy')
-
-    fig = px.imshow(economy.sort_values('economy').T, aspect="auto", text_auto=True,
-                    labels=dict(x="Bowler", y="Metric", color="Economy"))
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(analytics.figure('economy'), use_container_width=True)
 
     st.header("Dismissal Types Distribution")
-    dismissals = deliveries[deliveries['dismissal_kind'].notnull()]
-    fig = px.pie(dismissals, names='dismissal_kind', title="Dismissal Types")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(analytics.figure('dismissals'), use_container_width=True)
 
     st.header("Wickets per Bowler")
-    wickets = dismissals.groupby('bowler').size().reset_index(name='wickets')
-    fig = px.bar(wickets.sort_values('wickets', ascending=True), 
-                 x='wickets', y='bowler', orientation='h', color='wickets')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(analytics.figure('wickets'), use_container_width=True)
 
     st.header("Top Run Scorers")
-    run_scorers = deliveries.groupby('batter')['runs_batter'].sum().reset_index().sort_values('runs_batter', ascending=False)
-    st.dataframe(run_scorers, use_container_width=True)
+    st.dataframe(analytics.batting, use_container_width=True)
 
     st.header("Key Moments Timeline")
-    moments = deliveries[(deliveries['runs_batter'] >= 50) | (deliveries['dismissal_kind'].notnull())]
-    moments['desc'] = moments.apply(
-        lambda x: f"{x['batter']} 50 Runs" if x['runs_batter'] >= 50 else f"{x.get('batter', 'Unknown')} Out ({x.get('dismissal_kind', 'Unknown')})",
-        axis=1
-    )
-    fig = px.scatter(moments, x='over_number', y='inning', text='desc',
-                     labels={'over_number': 'Over', 'inning': 'Inning'}, title="Key Moments Timeline")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(analytics.figure('moments'), use_container_width=True)
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-from utils.db_connections import get_connection
+from utils.db_connections import run_queries
+from utils.leaderboards import get_leaderboards
+from utils.data_version import data_version
 from utils.queries import *
 import plotly.express as px
 
@@ -10,22 +12,24 @@ st.set_page_config(
 
 st.title("🏏 IPL Tournament Overview")
 
-conn = get_connection()
-
 # Fetch the data from the database
-matches_df = pd.read_sql_query(total_matches_query, conn)
-runs_df = pd.read_sql(total_runs_query, conn)
-wickets_df = pd.read_sql(total_wickets_query, conn)
-top_batter_df = pd.read_sql(top_batter_query, conn)
-top_bowler_df = pd.read_sql(top_bowler_query, conn)
-top_six_hitters_df = pd.read_sql(top_six_hitter_query, conn)
-top_four_hitters_df = pd.read_sql(top_four_hitter_query, conn)
-top_dot_balls_df = pd.read_sql(most_dot_balls_query, conn)
-season_runs_wickets_df = pd.read_sql(season_runs_wickets_query, conn)
-toss_df = pd.read_sql(toss_winner_query, conn)
-total_catches_df = pd.read_sql(dismissal_types_query, conn)
-top_fielders_df = pd.read_sql(caught_fielders_query, conn)
-pom_df = pd.read_sql(player_of_the_match_query, conn)
+results = run_queries(overview_queries, data_version())
+matches_df = results['total_matches']
+season_runs_wickets_df = results['season_runs_wickets']
+toss_df = results['toss_winner']
+pom_df = results['player_of_the_match']
+
+# Leaderboards and venue totals are slices of the aggregate tables, or of one
+# pass over the store when those are behind
+leaderboards = get_leaderboards(data_version())
+totals = leaderboards.totals
+venue_df = leaderboards.venues
+top_batter_df = leaderboards.top('batting', 'runs')
+top_bowler_df = leaderboards.top('bowling', 'wickets')
+top_six_hitters_df = leaderboards.top('batting', 'sixes')
+top_four_hitters_df = leaderboards.top('batting', 'fours')
+top_dot_balls_df = leaderboards.top('bowling', 'dots')
+top_fielders_df = leaderboards.top('fielding', 'catches')
 
 
 # Tournament Summary
@@ -33,8 +37,8 @@ st.markdown("## Tournament Summary")
 
 col1, col2, col3 = st.columns(3)
 col1.metric("Total Matches", matches_df['total_matches'][0])
-col2.metric("Total Runs Scored", runs_df['total_runs'][0])
-col3.metric("Total Wickets Taken", wickets_df['total_wickets'][0])
+col2.metric("Total Runs Scored", totals['total_runs'])
+col3.metric("Total Wickets Taken", totals['total_wickets'])
 
 st.markdown("---")
 
@@ -84,6 +88,25 @@ st.table(top_dot_balls_df)
 
 st.markdown("---")
 
+# Venues
+st.markdown("## Venues")
+
+col12, col13 = st.columns(2)
+
+with col12:
+    st.subheader("🏟️ Highest Scoring Venues")
+    st.table(venue_df.nlargest(5, 'total_runs')[['venue', 'total_runs']].reset_index(drop=True))
+
+with col13:
+    st.subheader("🎯 Most Wickets by Venue")
+    st.table(venue_df.nlargest(5, 'total_wickets')[['venue', 'total_wickets']].reset_index(drop=True))
+
+fig6 = px.bar(venue_df.sort_values('avg_score', ascending=False), x='venue', y='avg_score',
+              title="Average Score per Innings by Venue")
+st.plotly_chart(fig6, use_container_width=True)
+
+st.markdown("---")
+
 # Additional Visualizations
 st.markdown("## Visual Insights")
 
@@ -113,7 +136,7 @@ toss_df['conversion_%'] = round((toss_df['matches_won_after_toss'] / toss_df['to
 
 # KPIs
 col1, col2, col3 = st.columns(3)
-col1.metric("Total Catches", total_catches_df['total_catches'][0])
+col1.metric("Total Catches", totals['total_catches'])
 col2.metric("Best Toss to Win Conversion %", f"{toss_df['conversion_%'].max()}%")
 col3.metric("Most Player of the Match Awards", f"{pom_df['awards'].max()} by {pom_df['player_of_match'][0]}")
 
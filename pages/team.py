@@ -3,42 +3,35 @@ import pandas as pd
 import psycopg2
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.db_connections import get_connection
+from utils.data_version import data_version, entity_version
+from utils.warmup import record_view, start_warmup
+from utils.team_stats import (
+    load_teams,
+    get_team_overview,
+    top_run_scorers,
+    top_wicket_takers,
+    win_distribution_by_venue,
+    season_wise_performance,
+    toss_decision_stats,
+    top_partnerships,
+    partnership_records,
+)
 from plotly.subplots import make_subplots
 
 st.set_page_config(page_title="Team Analysis", layout="wide")
 
 st.title("🏏 Team Analysis")
 
-# DB connection
-conn = get_connection()
-
 # Load Teams
-@st.cache_data
-def load_teams():
-    query = "SELECT DISTINCT team_name FROM  public.teams ORDER BY team_name"
-    df = pd.read_sql(query, conn)
-    return df['team_name'].tolist()
-
-teams = load_teams()
+teams = load_teams(data_version())
 
 selected_team = st.selectbox("Select Team", teams)
+team_version = entity_version('team', selected_team)
+record_view('team', selected_team)
+start_warmup(data_version())
 
 # Team Overview KPIs
-@st.cache_data
-def get_team_overview(team_name):
-    query = f"""
-        SELECT 
-            COUNT(DISTINCT match_id) AS matches_played,
-            SUM(CASE WHEN winner = '{team_name}' THEN 1 ELSE 0 END) AS wins,
-            ROUND(SUM(CASE WHEN winner = '{team_name}' THEN 1 ELSE 0 END) * 100.0 / COUNT(DISTINCT match_id), 2) AS win_pct
-        FROM  public.matches
-        WHERE team_1 = '{team_name}' OR team_2 = '{team_name}'
-    """
-    df = pd.read_sql(query, conn)
-    return df.iloc[0]
-
-overview = get_team_overview(selected_team)
+overview = get_team_overview(selected_team, team_version)
 
 st.subheader(f"📊 {selected_team} Overview")
 
@@ -48,76 +41,26 @@ kpi2.metric("Wins", overview['wins'])
 kpi3.metric("Win %", overview['win_pct'])
 
 # Top Run Scorers
-@st.cache_data
-def top_run_scorers(team_name):
-    query = f"""
-        SELECT batter, SUM(runs_batter) AS runs
-        FROM  public.deliveries d
-        JOIN  public.matches m ON d.match_id = m.match_id
-        WHERE team_1 = '{team_name}' OR team_2 = '{team_name}'
-        GROUP BY batter
-        ORDER BY runs DESC
-        LIMIT 5
-    """
-    return pd.read_sql(query, conn)
-
 st.subheader("🏏 Top Run Scorers")
-batting_df = top_run_scorers(selected_team)
+batting_df = top_run_scorers(selected_team, team_version)
 fig1 = px.bar(batting_df, x='batter', y='runs', color='batter', title='Top Run Scorers', text='runs')
 st.plotly_chart(fig1, use_container_width=True)
 
 # Top Wicket Takers
-@st.cache_data
-def top_wicket_takers(team_name):
-    query = f"""
-        SELECT bowler, COUNT(*) AS wickets
-        FROM  public.deliveries d
-        JOIN  public.matches m ON d.match_id = m.match_id
-        WHERE wicket = TRUE
-          AND (team_1 = '{team_name}' OR team_2 = '{team_name}')
-        GROUP BY bowler
-        ORDER BY wickets DESC
-        LIMIT 5
-    """
-    return pd.read_sql(query, conn)
-
 st.subheader("🎯 Top Wicket Takers")
-bowling_df = top_wicket_takers(selected_team)
+bowling_df = top_wicket_takers(selected_team, team_version)
 fig2 = px.bar(bowling_df, x='bowler', y='wickets', color='bowler', title='Top Wicket Takers', text='wickets')
 st.plotly_chart(fig2, use_container_width=True)
 
 # Win Distribution by Venue
-@st.cache_data
-def win_distribution_by_venue(team_name):
-    query = f"""
-        SELECT venue, COUNT(*) AS wins
-        FROM  public.matches
-        WHERE winner = '{team_name}'
-        GROUP BY venue
-        ORDER BY wins DESC
-    """
-    return pd.read_sql(query, conn)
-
 st.subheader("🏟️ Win Distribution by Venue")
-venue_df = win_distribution_by_venue(selected_team)
+venue_df = win_distribution_by_venue(selected_team, team_version)
 fig3 = px.pie(venue_df, names='venue', values='wins', title='Win % by Venue')
 st.plotly_chart(fig3, use_container_width=True)
 
 # Season Wise Performance
-@st.cache_data
-def season_wise_performance(team_name):
-    query = f"""
-        SELECT season, COUNT(*) AS matches, 
-        SUM(CASE WHEN winner = '{team_name}' THEN 1 ELSE 0 END) AS wins
-        FROM  public.matches
-        WHERE team_1 = '{team_name}' OR team_2 = '{team_name}'
-        GROUP BY season
-        ORDER BY season
-    """
-    return pd.read_sql(query, conn)
-
 st.subheader("📈 Season-wise Performance")
-season_df = season_wise_performance(selected_team)
+season_df = season_wise_performance(selected_team, team_version)
 season_df['win_pct'] = (season_df['wins'] * 100) / season_df['matches']
 
 # Create Subplot with Secondary Y Axis
@@ -151,19 +94,19 @@ fig4.update_yaxes(title_text="Win %", secondary_y=True)
 
 st.plotly_chart(fig4, use_container_width=True)
 
-
 # Toss Decision Stats
-@st.cache_data
-def toss_decision_stats(team_name):
-    query = f"""
-        SELECT toss_decision, COUNT(*) AS count
-        FROM  public.matches
-        WHERE toss_winner = '{team_name}'
-        GROUP BY toss_decision
-    """
-    return pd.read_sql(query, conn)
-
 st.subheader("🪙 Toss Decisions")
-toss_df = toss_decision_stats(selected_team)
+toss_df = toss_decision_stats(selected_team, team_version)
 fig5 = px.pie(toss_df, names='toss_decision', values='count', hole=0.4, title='Toss Decision Split')
 st.plotly_chart(fig5, use_container_width=True)
+
+# Partnerships
+st.subheader("🤝 Highest Partnerships")
+partnership_df = top_partnerships(selected_team, team_version)
+partnership_df['pair'] = partnership_df['batter_1'] + " & " + partnership_df['batter_2']
+fig6 = px.bar(partnership_df, x='pair', y='runs', text='runs', hover_data=['match_id', 'season', 'wicket', 'balls'],
+              title='Highest Partnerships')
+st.plotly_chart(fig6, use_container_width=True)
+
+st.subheader("🧱 Partnership Records by Wicket")
+st.dataframe(partnership_records(selected_team, team_version), use_container_width=True)
@@ -1,11 +1,10 @@
+import os
+
 import streamlit as st
 import base64
+from utils.data_version import data_version
+from utils.warmup import start_warmup
 
-st.set_page_config(
-    page_title="IPL Tournament Dashboard",
-    page_icon="🏏",
-    layout="wide",
-)
 
 def set_bg_from_local(image_file):
     with open(image_file, "rb") as img:
@@ -25,25 +24,55 @@ def set_bg_from_local(image_file):
         unsafe_allow_html=True
     )
 
-# Call the function
-set_bg_from_local("utils/random_ipl_image_2.png")
+def home():
+    st.set_page_config(
+        page_title="IPL Tournament Dashboard",
+        page_icon="🏏",
+        layout="wide",
+    )
+
+    # Call the function
+    set_bg_from_local("utils/random_ipl_image_2.png")
+
+
+    st.title("🏆 IPL Tournament Dashboard")
+
+    st.markdown("""
+    Welcome to the IPL Tournament Dashboard!  
+    This dashboard provides detailed analysis of the tournament, teams, and players using ball-by-ball data.
 
+    Use the sidebar to navigate across different pages:
+    - Tournament Overview  
+    - Team Analysis  
+    - Player Analysis  
+    - Venue Analysis  
 
-st.title("🏆 IPL Tournament Dashboard")
+    Built with ❤️ using Streamlit and PostgreSQL and Airflow.
+    """)
 
-st.markdown("""
-Welcome to the IPL Tournament Dashboard!  
-This dashboard provides detailed analysis of the tournament, teams, and players using ball-by-ball data.
+    # st.image("https://resources.pulse.icc-cricket.com/ICC/photo/2023/03/31/711kz1WI-Fans.jpg", use_column_width=True)
 
-Use the sidebar to navigate across different pages:
-- Tournament Overview  
-- Team Analysis  
-- Player Analysis  
-- Venue Analysis  
+    st.markdown("---")
 
-Built with ❤️ using Streamlit and PostgreSQL and Airflow.
-""")
+    # Pre-warm team, venue and player caches in the background
+    warmup = start_warmup(data_version())
+    progress = warmup.progress()
+    if progress['running']:
+        st.sidebar.progress(progress['fraction'], text=f"Warming caches: {progress['done']}/{progress['total']}")
 
-# st.image("https://resources.pulse.icc-cricket.com/ICC/photo/2023/03/31/711kz1WI-Fans.jpg", use_column_width=True)
 
-st.markdown("---")
+# Pages are listed explicitly so the diagnostics page is only registered for
+# a session that opened it with the right token; everyone else never sees it
+# in the sidebar, and /diagnostics falls back to the home page
+pages = [
+    st.Page(home, title="IPL Tournament Dashboard", icon="🏏", default=True),
+    st.Page("pages/match.py"),
+    st.Page("pages/overview.py"),
+    st.Page("pages/player.py"),
+    st.Page("pages/team.py"),
+    st.Page("pages/venue.py"),
+]
+token = os.environ.get("IPL_DIAGNOSTICS_TOKEN")
+if token and st.query_params.get("token") == token:
+    pages.append(st.Page("pages/diagnostics.py"))
+st.navigation(pages).run()
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+# Every test runs on a small generated league: its store is exported as a
+# snapshot the app reads through IPL_SNAPSHOT_DIR, so the loaders and the
+# DuckDB engine see the same data, and loader results are cached in a
+# scratch file instead of the app's own.
+
+
+@pytest.fixture(scope="session")
+def frames():
+    from utils.synthetic import generate
+
+    return generate(seasons=3, n_teams=4, players_per_team=12, seed=7)
+
+
+@pytest.fixture(scope="session")
+def snapshot(frames, tmp_path_factory):
+    from utils import data_version as data_version_module
+    from utils import result_cache
+    from utils.snapshot import export_snapshot
+    from utils.store import ColumnStore, _load_store
+
+    directory = str(tmp_path_factory.mktemp("snapshot"))
+    store = ColumnStore.from_frames(frames['deliveries'], frames['matches'],
+                                    frames['players']['player_name'], frames['teams']['team_name'],
+                                    frames['innings'])
+    export_snapshot(store, directory)
+
+    previous = os.environ.get("IPL_SNAPSHOT_DIR")
+    os.environ["IPL_SNAPSHOT_DIR"] = directory
+    data_version_module._version = None
+    _load_store.clear()
+    result_cache._cache = result_cache.ResultCache(str(tmp_path_factory.mktemp("cache") / "results.sqlite3"))
+    yield directory
+    # Release the mapped files before the directory is removed
+    _load_store.clear()
+    result_cache._cache = None
+    data_version_module._version = None
+    if previous is None:
+        os.environ.pop("IPL_SNAPSHOT_DIR", None)
+    else:
+        os.environ["IPL_SNAPSHOT_DIR"] = previous
+
+
+@pytest.fixture(scope="session")
+def store(snapshot):
+    from utils.store import get_store
+
+    return get_store()
+
+
+@pytest.fixture(scope="session")
+def engine(snapshot):
+    from utils.engines import DuckDBEngine
+
+    return DuckDBEngine(snapshot)
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from utils.aggregates import AGGREGATES, apply_delta, rebuild
+
+# Delta-maintained aggregate tables against a full rebuild, after loading,
+# removing and correcting whole matches the way utils.ingest does. Needs a
+# scratch Postgres database in IPL_TEST_DSN; its tables are replaced.
+DSN = os.environ.get("IPL_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="IPL_TEST_DSN is not set")
+
+TABLES = ('deliveries', 'innings', 'matches')
+
+
+@pytest.fixture(scope="module")
+def conn(frames):
+    import psycopg2
+    from utils.synthetic import load_into_postgres
+
+    conn = psycopg2.connect(DSN)
+    load_into_postgres(conn, frames)
+    yield conn
+    conn.close()
+
+
+def contents(conn):
+    with conn.cursor() as cur:
+        result = {}
+        for table in AGGREGATES:
+            cur.execute(f"SELECT * FROM public.{table}")
+            result[table] = sorted(cur.fetchall())
+    conn.rollback()
+    return result
+
+
+def assert_rebuilds_to_same(conn):
+    maintained = contents(conn)
+    rebuild(conn)
+    assert contents(conn) == maintained
+
+
+def remove(cur, match_ids):
+    apply_delta(cur, match_ids, -1)
+    for table in TABLES:
+        cur.execute(f"DELETE FROM public.{table} WHERE match_id = ANY(%s)", (match_ids,))
+
+
+def test_loaded_tables_match_rebuild(conn):
+    assert_rebuilds_to_same(conn)
+
+
+def test_remove_and_reload_matches(conn):
+    match_ids = [1, 2, 17]
+    with conn.cursor() as cur:
+        for table in TABLES:
+            cur.execute(f"CREATE TEMP TABLE held_{table} AS "
+                        f"SELECT * FROM public.{table} WHERE match_id = ANY(%s)", (match_ids,))
+        remove(cur, match_ids)
+    conn.commit()
+    assert_rebuilds_to_same(conn)
+
+    with conn.cursor() as cur:
+        for table in reversed(TABLES):
+            cur.execute(f"INSERT INTO public.{table} SELECT * FROM held_{table}")
+            cur.execute(f"DROP TABLE held_{table}")
+        apply_delta(cur, match_ids, 1)
+    conn.commit()
+    assert_rebuilds_to_same(conn)
+
+
+def test_corrected_match(conn):
+    # A correction moves the match to a new venue and credits its runs and
+    # catches to a player seen nowhere else; a second one moves them back,
+    # which must drop that player's and that venue's rows again
+    match_id = 5
+    with conn.cursor() as cur:
+        cur.execute("SELECT venue FROM public.matches WHERE match_id = %s", (match_id,))
+        venue = cur.fetchone()[0]
+        cur.execute("SELECT batter FROM public.deliveries WHERE match_id = %s LIMIT 1", (match_id,))
+        batter = cur.fetchone()[0]
+    for new_venue, new_batter, old_batter in (('Test Ground', 'Test Player', batter),
+                                              (venue, batter, 'Test Player')):
+        with conn.cursor() as cur:
+            apply_delta(cur, [match_id], -1)
+            cur.execute("UPDATE public.matches SET venue = %s WHERE match_id = %s", (new_venue, match_id))
+            cur.execute("UPDATE public.deliveries SET batter = %s, runs_batter = runs_batter + 1, "
+                        "runs_total = runs_total + 1 WHERE match_id = %s AND batter = %s",
+                        (new_batter, match_id, old_batter))
+            cur.execute("UPDATE public.deliveries SET fielder = %s WHERE match_id = %s AND fielder IS NOT NULL",
+                        (new_batter, match_id))
+            apply_delta(cur, [match_id], 1)
+        conn.commit()
+        assert_rebuilds_to_same(conn)
+    assert not any('Test Player' in row or 'Test Ground' in row for rows in contents(conn).values() for row in rows)
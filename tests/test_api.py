@@ -0,0 +1,111 @@
+import gzip
+import http.client
+import json
+import threading
+from urllib.parse import quote
+
+import pytest
+from utils import api
+
+# The JSON API over a live server on a free port: ETags, conditional
+# requests and gzip negotiation.
+
+
+@pytest.fixture(scope="module")
+def server(snapshot):
+    api.response_cache.clear()
+    server = api.serve('127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, method='GET', **headers):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=60)
+    try:
+        conn.request(method, path, headers={name.replace('_', '-'): value for name, value in headers.items()})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_etag_and_not_modified(server):
+    status, headers, body = get(server, '/teams')
+    assert status == 200
+    etag = headers['ETag']
+    assert json.loads(body)
+    assert headers['Cache-Control'] == 'no-cache'
+
+    status, headers, body = get(server, '/teams', If_None_Match=etag)
+    assert (status, headers['ETag'], body) == (304, etag, b'')
+    assert get(server, '/teams', If_None_Match=f"W/{etag}")[0] == 304
+    assert get(server, '/teams', If_None_Match=f'"other", {etag}')[0] == 304
+    assert get(server, '/teams', If_None_Match='*')[0] == 304
+    assert get(server, '/teams', If_None_Match='"other"')[0] == 200
+
+
+def test_etag_depends_on_path_and_query(server, store):
+    player = quote(store.player_names[0])
+    paths = ['/teams', '/venues', f"/players/{player}/season_wise_performance",
+             f"/players/{player}/season_wise_performance?role=Batter"]
+    etags = [get(server, path)[1]['ETag'] for path in paths]
+    assert len(set(etags)) == len(paths)
+    assert get(server, '/teams/')[1]['ETag'] == etags[0]
+
+
+def test_unknown_path_is_never_not_modified(server):
+    etag = get(server, '/teams')[1]['ETag']
+    status, _, body = get(server, '/nowhere', If_None_Match='*')
+    assert status == 404
+    assert 'error' in json.loads(body)
+    assert get(server, '/teams/Nobody', If_None_Match=etag)[0] == 404
+
+
+def test_gzip_negotiation(server, store):
+    path = f"/teams/{quote(store.team_names[0])}"
+    status, headers, plain = get(server, path)
+    assert status == 200 and 'Content-Encoding' not in headers
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert len(plain) >= api.GZIP_MIN_BYTES
+
+    status, headers, body = get(server, path, Accept_Encoding='br, gzip')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert int(headers['Content-Length']) == len(body)
+    assert gzip.decompress(body) == plain
+
+    for refused in ('gzip;q=0', 'gzip; q=0.0, deflate', '*;q=0', 'gzip;q=0, *;q=1', 'identity'):
+        status, headers, body = get(server, path, Accept_Encoding=refused)
+        assert 'Content-Encoding' not in headers, refused
+        assert body == plain
+
+    # Bodies under the threshold go out as they are
+    status, headers, body = get(server, '/', Accept_Encoding='gzip')
+    assert len(body) < api.GZIP_MIN_BYTES and 'Content-Encoding' not in headers
+
+
+def test_head_sends_headers_only(server):
+    _, get_headers, body = get(server, '/venues')
+    status, headers, head_body = get(server, '/venues', method='HEAD')
+    assert status == 200 and head_body == b''
+    assert headers['ETag'] == get_headers['ETag']
+    assert int(headers['Content-Length']) == len(body)
+
+
+@pytest.mark.parametrize('header, accepted', [
+    (None, False),
+    ('', False),
+    ('gzip', True),
+    ('GZIP;Q=0.5', True),
+    ('gzip;q=0', False),
+    ('deflate, gzip;q=0.001', True),
+    ('*', True),
+    ('*;q=0', False),
+    ('gzip;q=0, *', False),
+    ('br;q=1, *;q=0.1', True),
+    ('gzip;q=bogus', False),
+])
+def test_accepts_gzip(header, accepted):
+    assert api._accepts_gzip(header) == accepted
@@ -0,0 +1,301 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils import player_stats, team_stats, venue_stats
+from utils.data_version import data_version, entity_version
+from utils.queries import Query
+
+# Each page loader against the SQL the page ran before the store served it,
+# both over the same generated data: the loader through the store, the SQL
+# through the DuckDB engine over the store's snapshot. Loaders added since
+# are checked against the same figures written as SQL. How a result is
+# compared: 'rows' the same rows in any order, ('top', metric, n) the n
+# largest by metric with ties in any order, 'best' one of the tied best
+# rows per wicket.
+
+PHASE = """CASE
+               WHEN over_number <= 6 THEN 'Powerplay'
+               WHEN over_number >= 7 AND over_number <= 15 THEN 'Middle Overs'
+               ELSE 'Death Overs'
+           END"""
+
+# Every partnership, as utils.partnerships splits the innings: at the first
+# ball, after each wicket and whenever the pair at the crease changes
+PARTNERSHIPS = """
+    WITH ordered AS (
+        SELECT d.*, LEAST(batter, non_striker) AS batter_1, GREATEST(batter, non_striker) AS batter_2,
+               ROW_NUMBER() OVER (ORDER BY match_id, inning, over_number, ball_number) AS seq
+        FROM public.deliveries d
+    ), flagged AS (
+        SELECT *,
+               LAG(wicket) OVER innings AS after_wicket,
+               LAG(batter_1) OVER innings AS previous_1,
+               LAG(batter_2) OVER innings AS previous_2,
+               SUM(CASE WHEN wicket THEN 1 ELSE 0 END) OVER innings
+                   - CASE WHEN wicket THEN 1 ELSE 0 END AS fallen
+        FROM ordered
+        WINDOW innings AS (PARTITION BY match_id, inning ORDER BY seq)
+    ), numbered AS (
+        SELECT *, SUM(CASE WHEN after_wicket IS NULL OR after_wicket
+                                OR previous_1 <> batter_1 OR previous_2 <> batter_2
+                           THEN 1 ELSE 0 END) OVER (ORDER BY seq) AS partnership
+        FROM flagged
+    )
+    SELECT p.match_id, m.season, p.inning, MIN(p.fallen) + 1 AS wicket, p.batter_1, p.batter_2,
+           SUM(p.runs_total) AS runs, COUNT(*) AS balls,
+           SUM(CASE WHEN p.batter = p.batter_1 THEN p.runs_batter ELSE 0 END) AS batter_1_runs,
+           SUM(CASE WHEN p.batter = p.batter_2 THEN p.runs_batter ELSE 0 END) AS batter_2_runs,
+           NOT BOOL_OR(p.wicket) AS unbeaten, i.batting_team
+    FROM numbered p
+    JOIN public.matches m ON m.match_id = p.match_id
+    JOIN public.innings i ON i.match_id = p.match_id AND i.inning = p.inning
+    GROUP BY p.partnership, p.match_id, m.season, p.inning, p.batter_1, p.batter_2, i.batting_team
+"""
+PARTNERSHIP_COLUMNS = ("match_id, season, inning, wicket, batter_1, batter_2, runs, balls, "
+                       "batter_1_runs, batter_2_runs, unbeaten")
+
+PLAYER_SQL = {
+    'runs_per_over_phase': ('rows', f"""
+        SELECT {PHASE} AS phase, SUM(runs_batter) AS runs
+        FROM public.deliveries
+        WHERE batter = $1
+        GROUP BY phase"""),
+    'season_wise_performance': ('rows', """
+        SELECT m.season, SUM(d.runs_batter) AS runs,
+               COUNT(CASE WHEN d.wicket = TRUE THEN 1 END) AS wickets
+        FROM public.deliveries d
+        JOIN public.matches m USING(match_id)
+        WHERE batter = $1 OR bowler = $1
+        GROUP BY m.season"""),
+    'dismissal_types': ('rows', """
+        SELECT dismissal_kind, COUNT(*) AS count
+        FROM public.deliveries
+        WHERE batter = $1 AND dismissal_kind IS NOT NULL
+        GROUP BY dismissal_kind"""),
+    'boundary_analysis': ('rows', """
+        SELECT SUM(CASE WHEN runs_batter = 4 THEN 1 ELSE 0 END) AS Fours,
+               SUM(CASE WHEN runs_batter = 6 THEN 1 ELSE 0 END) AS Sixes
+        FROM public.deliveries
+        WHERE batter = $1"""),
+    'strike_rate_by_phase': ('rows', f"""
+        SELECT {PHASE} AS phase, ROUND(SUM(runs_batter) * 100.0 / COUNT(*), 2) AS strike_rate
+        FROM public.deliveries
+        WHERE batter = $1
+        GROUP BY phase"""),
+    'player_top_venues': (('top', 'matches', 5), """
+        SELECT venue, COUNT(DISTINCT match_id) AS matches
+        FROM public.deliveries d
+        JOIN public.matches m USING(match_id)
+        WHERE batter = $1 OR bowler = $1
+        GROUP BY venue"""),
+    'player_vs_bowler': (('top', 'runs', 5), """
+        SELECT bowler, SUM(runs_batter) AS runs, COUNT(*) AS balls_faced
+        FROM public.deliveries d
+        WHERE batter = $1
+        GROUP BY bowler"""),
+    'bowler_vs_batter': (('top', 'dismissals', 5), """
+        SELECT batter,
+               COUNT(*) FILTER (WHERE wicket AND dismissal_kind IS DISTINCT FROM 'run out') AS dismissals,
+               COUNT(*) AS balls, SUM(runs_batter) AS runs
+        FROM public.deliveries
+        WHERE bowler = $1
+        GROUP BY batter"""),
+    'top_partnerships': (('top', 'runs', 5), f"""
+        SELECT {PARTNERSHIP_COLUMNS}
+        FROM ({PARTNERSHIPS}) p
+        WHERE batter_1 = $1 OR batter_2 = $1"""),
+}
+
+TEAM_SQL = {
+    'get_team_overview': ('rows', """
+        SELECT COUNT(DISTINCT match_id) AS matches_played,
+               SUM(CASE WHEN winner = $1 THEN 1 ELSE 0 END) AS wins,
+               ROUND(SUM(CASE WHEN winner = $1 THEN 1 ELSE 0 END) * 100.0 / COUNT(DISTINCT match_id), 2) AS win_pct
+        FROM public.matches
+        WHERE team_1 = $1 OR team_2 = $1"""),
+    'top_run_scorers': (('top', 'runs', 5), """
+        SELECT batter, SUM(runs_batter) AS runs
+        FROM public.deliveries d
+        JOIN public.matches m ON d.match_id = m.match_id
+        WHERE team_1 = $1 OR team_2 = $1
+        GROUP BY batter"""),
+    'top_wicket_takers': (('top', 'wickets', 5), """
+        SELECT bowler, COUNT(*) AS wickets
+        FROM public.deliveries d
+        JOIN public.matches m ON d.match_id = m.match_id
+        WHERE wicket = TRUE
+          AND (team_1 = $1 OR team_2 = $1)
+        GROUP BY bowler"""),
+    'win_distribution_by_venue': ('rows', """
+        SELECT venue, COUNT(*) AS wins
+        FROM public.matches
+        WHERE winner = $1
+        GROUP BY venue"""),
+    'season_wise_performance': ('rows', """
+        SELECT season, COUNT(*) AS matches,
+               SUM(CASE WHEN winner = $1 THEN 1 ELSE 0 END) AS wins
+        FROM public.matches
+        WHERE team_1 = $1 OR team_2 = $1
+        GROUP BY season"""),
+    'toss_decision_stats': ('rows', """
+        SELECT toss_decision, COUNT(*) AS count
+        FROM public.matches
+        WHERE toss_winner = $1
+        GROUP BY toss_decision"""),
+    'top_partnerships': (('top', 'runs', 5), f"""
+        SELECT {PARTNERSHIP_COLUMNS}
+        FROM ({PARTNERSHIPS}) p
+        WHERE batting_team = $1"""),
+    'partnership_records': ('best', f"""
+        SELECT {PARTNERSHIP_COLUMNS}
+        FROM ({PARTNERSHIPS}) p
+        WHERE batting_team = $1
+        QUALIFY runs = MAX(runs) OVER (PARTITION BY wicket)"""),
+}
+
+VENUE_SQL = {
+    'venue_summary': ('rows', """
+        SELECT COUNT(DISTINCT match_id) AS matches,
+               SUM(runs_total) AS total_runs,
+               SUM(CASE WHEN winner IS NOT NULL THEN 1 ELSE 0 END) AS results_count
+        FROM public.matches m
+        JOIN public.deliveries d USING(match_id)
+        WHERE venue = $1"""),
+    'toss_decision_trend': ('rows', """
+        SELECT toss_decision, COUNT(*) AS count
+        FROM public.matches
+        WHERE venue = $1
+        GROUP BY toss_decision"""),
+    'average_scores_per_innings': ('rows', """
+        SELECT inning, AVG(total_runs) AS avg_runs
+        FROM (
+            SELECT m.match_id, inning, SUM(d.runs_batter + d.runs_extras) AS total_runs
+            FROM public.matches m
+            JOIN public.deliveries d USING(match_id)
+            WHERE venue = $1
+            GROUP BY m.match_id, inning
+        ) t
+        GROUP BY inning"""),
+    'top_performers': (('top', 'runs', 5), """
+        SELECT batter, SUM(runs_batter) AS runs
+        FROM public.deliveries d
+        JOIN public.matches m USING(match_id)
+        WHERE venue = $1
+        GROUP BY batter"""),
+    'venue_avg_runs': ('rows', """
+        SELECT AVG(total_runs) / 2 AS avg_runs_per_match
+        FROM (
+            SELECT match_id, SUM(runs_total) AS total_runs
+            FROM public.deliveries d
+            JOIN public.matches m USING(match_id)
+            WHERE m.venue = $1
+            GROUP BY match_id
+        ) sub"""),
+    'team_win_percentage': ('rows', """
+        SELECT winner, COUNT(*) AS wins
+        FROM public.matches
+        WHERE venue = $1 AND winner IS NOT NULL
+        GROUP BY winner"""),
+    'toss_to_win': ('rows', """
+        SELECT COUNT(*) AS toss_won,
+               SUM(CASE WHEN toss_winner = winner THEN 1 ELSE 0 END) AS matches_won_after_toss
+        FROM public.matches
+        WHERE venue = $1"""),
+    'abandoned_matches': ('rows', """
+        SELECT COUNT(*) AS abandoned_matches
+        FROM public.matches
+        WHERE venue = $1 AND winner LIKE 'No Result'"""),
+    'heatmap_data': ('rows', """
+        SELECT over_number, SUM(runs_total) AS runs
+        FROM public.deliveries d
+        JOIN public.matches m USING(match_id)
+        WHERE m.venue = $1
+        GROUP BY over_number"""),
+}
+
+LISTINGS = [
+    (player_stats.load_players, "SELECT DISTINCT player_name FROM public.players ORDER BY player_name"),
+    (team_stats.load_teams, "SELECT DISTINCT team_name FROM public.teams ORDER BY team_name"),
+    (venue_stats.load_venues, "SELECT DISTINCT venue FROM public.matches ORDER BY venue"),
+]
+
+CASES = [(kind, module, name, spec)
+         for kind, module, specs in (('player', player_stats, PLAYER_SQL),
+                                     ('team', team_stats, TEAM_SQL),
+                                     ('venue', venue_stats, VENUE_SQL))
+         for name, spec in specs.items()]
+
+
+def _entities(store, kind):
+    if kind == 'team':
+        return list(store.team_names)
+    if kind == 'venue':
+        return store.matches.labels('venue').tolist()
+    # The busiest batters and bowlers, and a tail-ender who rarely faces
+    d = store.deliveries
+    batters = np.bincount(d['batter'][d['batter'] >= 0])
+    bowlers = np.bincount(d['bowler'][d['bowler'] >= 0])
+    codes = list(np.argsort(-batters, kind='stable')[:2]) + list(np.argsort(-bowlers, kind='stable')[:2])
+    codes.append(np.flatnonzero(batters)[np.argmin(batters[batters > 0])])
+    return [d.labels('batter')[code] for code in codes]
+
+
+def _normalized(df):
+    # Labels as strings and numbers as floats, so the store's categoricals and
+    # int32 counts compare equal to DuckDB's strings and int64 sums
+    return pd.DataFrame({column: (df[column].astype(float) if pd.api.types.is_numeric_dtype(df[column])
+                                  else df[column].astype(str))
+                         for column in df.columns})
+
+
+def _contained(rows, expected):
+    return len(rows.merge(expected.drop_duplicates(), how='inner')) == len(rows)
+
+
+def check(result, expected, how):
+    if isinstance(result, pd.Series):
+        result = result.to_frame().T.infer_objects().reset_index(drop=True)
+    assert list(result.columns) == list(expected.columns)
+    result, expected = _normalized(result), _normalized(expected)
+    if how == 'rows':
+        order = list(result.columns)
+        pd.testing.assert_frame_equal(result.sort_values(order).reset_index(drop=True),
+                                      expected.sort_values(order).reset_index(drop=True),
+                                      check_exact=False, rtol=1e-9)
+    elif how == 'best':
+        assert sorted(result['wicket']) == sorted(expected['wicket'].unique())
+        assert _contained(result, expected)
+    else:
+        _, metric, n = how
+        top = expected[metric].sort_values(ascending=False).head(n)
+        assert result[metric].tolist() == top.tolist()
+        assert _contained(result, expected)
+
+
+def baseline(engine, label, sql, entity=None):
+    if entity is None:
+        return engine.execute(Query(label, sql), ())[0]
+    query = Query(label, sql, entity=str)
+    return engine.execute(query, query.bind(entity=entity))[0]
+
+
+@pytest.mark.parametrize('kind, module, name, spec', CASES,
+                         ids=[f"{kind}-{name}" for kind, _, name, _ in CASES])
+def test_loader_matches_sql(store, engine, kind, module, name, spec):
+    how, sql = spec
+    loader = getattr(module, name)
+    for entity in _entities(store, kind):
+        result = loader(entity, entity_version(kind, entity))
+        expected = baseline(engine, f"test_{kind}_{name}", sql, entity)
+        check(result, expected, how)
+
+
+@pytest.mark.parametrize('loader, sql', LISTINGS, ids=[loader.__name__ for loader, _ in LISTINGS])
+def test_listing_matches_sql(engine, snapshot, loader, sql):
+    expected = baseline(engine, f"test_{loader.__name__}", sql)
+    assert list(loader(data_version())) == expected.iloc[:, 0].tolist()
+
+
+def test_every_loader_is_covered():
+    for module, specs in ((player_stats, PLAYER_SQL), (team_stats, TEAM_SQL), (venue_stats, VENUE_SQL)):
+        assert [loader.__name__ for loader in module.loaders] == list(specs)
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from utils.result_cache import ResultCache, cached_result
+
+# The shared SQLite result cache: entries are evicted least recently used
+# first once their pickled size passes the byte budget.
+
+VALUE = b'x' * 1000
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # Room for about three of the test values, pickling overhead included
+    return ResultCache(str(tmp_path / "results.sqlite3"), budget_bytes=3500)
+
+
+def put(cache, key):
+    # Entries are ordered by their last-used time; keep them apart
+    time.sleep(0.002)
+    assert cache.put(key, 'test', VALUE)
+
+
+def test_stays_within_budget(cache):
+    for i in range(10):
+        put(cache, f"k{i}")
+        assert cache.stats()['bytes'] <= cache.budget_bytes
+    stats = cache.stats()
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 7
+    assert [cache.get(f"k{i}", 'test') is not None for i in range(7, 10)] == [True] * 3
+
+
+def test_evicts_least_recently_used(cache):
+    for key in ('a', 'b', 'c'):
+        put(cache, key)
+    time.sleep(0.002)
+    # A read counts as a use, so b is now the oldest
+    assert cache.get('a', 'test') == VALUE
+    put(cache, 'd')
+    assert cache.get('b', 'test') != VALUE
+    assert all(cache.get(key, 'test') == VALUE for key in ('a', 'c', 'd'))
+
+
+def test_rejects_values_over_budget(cache):
+    put(cache, 'a')
+    assert not cache.put('big', 'test', b'x' * 4000)
+    assert cache.get('a', 'test') == VALUE
+    assert cache.stats()['evictions'] == 0
+
+
+def test_cached_result_counts_hits_and_misses(cache, monkeypatch):
+    from utils import result_cache
+
+    monkeypatch.setattr(result_cache, '_cache', cache)
+    calls = []
+
+    @cached_result
+    def square(x, version):
+        calls.append(x)
+        return x * x
+
+    assert [square(3, 'v1'), square(3, 'v1'), square(3, version='v1'), square(3, 'v2')] == [9, 9, 9, 9]
+    assert calls == [3, 3]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 2)
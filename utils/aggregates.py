@@ -0,0 +1,133 @@
+import argparse
+import sys
+
+# Aggregate tables kept in step with deliveries by the ingestion loader and
+# read by the overview's leaderboards and venue totals. Each one is a GROUP
+# BY over deliveries joined to matches; its first metric counts the grouped
+# rows. Because every metric is a sum or a count, the aggregate over a set of
+# whole matches can be added or subtracted: loading a match adds its
+# contribution, correcting one subtracts the old rows first, and a group
+# whose row count reaches zero is dropped, exactly as a full recompute would.
+# The tables themselves are created by utils.migrations; changing a
+# definition here needs a new migration to match.
+AGGREGATES = {
+    'agg_batting': {
+        'keys': {'batter': 'd.batter'},
+        'metrics': {
+            'balls': 'COUNT(*)',
+            'runs': 'SUM(d.runs_batter)',
+            'fours': 'COUNT(*) FILTER (WHERE d.runs_batter = 4)',
+            'sixes': 'COUNT(*) FILTER (WHERE d.runs_batter = 6)',
+        },
+    },
+    'agg_bowling': {
+        'keys': {'bowler': 'd.bowler'},
+        'metrics': {
+            'balls': 'COUNT(*)',
+            'runs': 'SUM(d.runs_total)',
+            'wickets': 'COUNT(*) FILTER (WHERE d.wicket)',
+            'dots': 'COUNT(*) FILTER (WHERE d.runs_batter = 0 AND d.runs_extras = 0)',
+        },
+    },
+    'agg_fielding': {
+        'keys': {'fielder': 'd.fielder'},
+        'metrics': {
+            'catches': 'COUNT(*)',
+        },
+        'where': "d.dismissal_kind = 'caught'",
+    },
+    'agg_venue': {
+        'keys': {'venue': 'm.venue'},
+        'metrics': {
+            'balls': 'COUNT(*)',
+            # Distinct matches add up across disjoint sets of whole matches
+            'matches': 'COUNT(DISTINCT d.match_id)',
+            'runs': 'SUM(d.runs_total)',
+            'wickets': 'COUNT(*) FILTER (WHERE d.dismissal_kind IS NOT NULL)',
+        },
+    },
+}
+
+
+def select_sql(table, matches_filter=None):
+    # The aggregate over all deliveries, or only over the matches in %(match_ids)s
+    spec = AGGREGATES[table]
+    conditions = [f"{expr} IS NOT NULL" for expr in spec['keys'].values()]
+    if 'where' in spec:
+        conditions.append(spec['where'])
+    if matches_filter:
+        conditions.append("d.match_id = ANY(%(match_ids)s)")
+    keys = [f"{expr} AS {key}" for key, expr in spec['keys'].items()]
+    metrics = [f"{expr} AS {metric}" for metric, expr in spec['metrics'].items()]
+    return (f"SELECT {', '.join(keys + metrics)} "
+            f"FROM public.deliveries d JOIN public.matches m ON m.match_id = d.match_id "
+            f"WHERE {' AND '.join(conditions)} "
+            f"GROUP BY {', '.join(spec['keys'].values())}")
+
+
+def apply_delta(cur, match_ids, sign):
+    # Add (sign=1) or subtract (sign=-1) the contribution of whole matches.
+    # Run after inserting new rows, or before deleting rows being replaced.
+    if not match_ids:
+        return
+    for table, spec in AGGREGATES.items():
+        keys, metrics = list(spec['keys']), list(spec['metrics'])
+        signed = ', '.join(keys + [f"{sign} * {metric}" for metric in metrics])
+        updates = ', '.join(f"{metric} = {table}.{metric} + EXCLUDED.{metric}" for metric in metrics)
+        cur.execute(
+            f"INSERT INTO public.{table} ({', '.join(keys + metrics)}) "
+            f"SELECT {signed} FROM ({select_sql(table, matches_filter=True)}) delta "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}",
+            {'match_ids': list(match_ids)})
+        cur.execute(f"DELETE FROM public.{table} WHERE {metrics[0]} = 0")
+
+
+def rebuild(conn):
+    with conn.cursor() as cur:
+        for table in AGGREGATES:
+            cur.execute(f"TRUNCATE public.{table}")
+            cur.execute(f"INSERT INTO public.{table} {select_sql(table)}")
+    conn.commit()
+
+
+def verify(conn):
+    # Rows that differ between each maintained table and a full recompute
+    mismatches = {}
+    with conn.cursor() as cur:
+        for table in AGGREGATES:
+            full = select_sql(table)
+            cur.execute(f"SELECT COUNT(*) FROM ((TABLE public.{table} EXCEPT ALL {full}) "
+                        f"UNION ALL ({full} EXCEPT ALL TABLE public.{table})) diff")
+            count = cur.fetchone()[0]
+            if count:
+                mismatches[table] = count
+    conn.rollback()
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild or verify the delta-maintained aggregate tables")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--dsn", help="database to use instead of the app's configured one")
+    args = parser.parse_args(argv)
+
+    from utils.db_connections import connect
+
+    conn = connect(args.dsn)
+    try:
+        if args.command == "rebuild":
+            rebuild(conn)
+            print(f"Rebuilt {len(AGGREGATES)} aggregate tables")
+            return 0
+        mismatches = verify(conn)
+        for table, count in mismatches.items():
+            print(f"MISMATCH {table}: {count} rows differ from a full recompute", file=sys.stderr)
+        print("Aggregates match a full recompute" if not mismatches else f"{len(mismatches)} tables differ")
+        return 1 if mismatches else 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # python -m utils.aggregates rebuild|verify [--dsn ...]
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import argparse
+import gzip
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+from utils import player_stats, team_stats, venue_stats
+from utils.data_version import data_version, entity_version
+from utils.instrumentation import recorder
+from utils.match_analytics import get_match_analytics, load_matches
+from utils.win_probability import win_probability
+
+# Read-only JSON API over the same loaders the pages use:
+#   /teams, /venues, /players, /matches                   entity lists
+#   /teams/<name>, /venues/<name>, /players/<name>        every loader of the page
+#   /teams/<name>/<loader>, ...                           one loader; query string
+#                                                         fills its filters
+#   /matches/<id>, /matches/<id>/win_probability
+# Responses carry an ETag derived from the data version, so clients polling
+# with If-None-Match get a 304 until new data lands, and rendered bodies are
+# kept in an in-process LRU keyed by path and query.
+API_HOST = os.environ.get("IPL_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("IPL_API_PORT", 8502))
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("IPL_API_CACHE_ENTRIES", 1024))
+# Smaller bodies are sent as they are; gzip would not pay for itself
+GZIP_MIN_BYTES = 1024
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = {
+    'teams': ('team', team_stats.load_teams, team_stats.loaders),
+    'venues': ('venue', venue_stats.load_venues, venue_stats.loaders),
+    'players': ('player', player_stats.load_players, player_stats.loaders),
+}
+# Query parameters with a fixed set of values
+CHOICES = {
+    'role': player_stats.ROLES,
+    'match_type': player_stats.MATCH_TYPES,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _jsonable(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        orient = 'records' if isinstance(value, pd.DataFrame) else 'index'
+        return json.loads(value.to_json(orient=orient, date_format='iso', default_handler=str))
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _loader_kwargs(loader, query):
+    # Query parameters the loader accepts, converted to its defaults' types
+    parameters = list(inspect.signature(loader).parameters.values())[2:]
+    kwargs = {}
+    for parameter in parameters:
+        if parameter.name not in query:
+            continue
+        value = query[parameter.name]
+        if parameter.name in CHOICES and value not in CHOICES[parameter.name]:
+            raise ApiError(400, f"{parameter.name} must be one of {list(CHOICES[parameter.name])}")
+        try:
+            kwargs[parameter.name] = type(parameter.default)(value)
+        except ValueError:
+            raise ApiError(400, f"Invalid {parameter.name}: {value}")
+    unknown = set(query) - {parameter.name for parameter in parameters}
+    if unknown:
+        raise ApiError(400, f"Unknown parameters: {sorted(unknown)}")
+    return kwargs
+
+
+def _entity(collection, parts, query):
+    kind, load, loaders = ENTITIES[collection]
+    if not parts:
+        if query:
+            raise ApiError(400, f"Unknown parameters: {sorted(query)}")
+        return load(data_version())
+    name = parts[0]
+    if name not in load(data_version()):
+        raise ApiError(404, f"Unknown {kind}: {name}")
+    version = entity_version(kind, name)
+    by_name = {loader.__name__: loader for loader in loaders}
+    if len(parts) == 1:
+        if query:
+            raise ApiError(400, "Filters apply to a single loader")
+        return {loader_name: loader(name, version) for loader_name, loader in by_name.items()}
+    if len(parts) > 2 or parts[1] not in by_name:
+        raise ApiError(404, f"Unknown {kind} resource: {'/'.join(parts[1:])}")
+    loader = by_name[parts[1]]
+    return loader(name, version, **_loader_kwargs(loader, query))
+
+
+def _match(parts, query):
+    if query:
+        raise ApiError(400, f"Unknown parameters: {sorted(query)}")
+    matches = load_matches(data_version())
+    if not parts:
+        return matches
+    try:
+        match_id = int(parts[0])
+    except ValueError:
+        raise ApiError(404, f"Unknown match: {parts[0]}")
+    if not (matches['match_id'] == match_id).any():
+        raise ApiError(404, f"Unknown match: {match_id}")
+    version = entity_version('match', match_id)
+    if len(parts) == 1:
+        analytics = get_match_analytics(match_id, version)
+        return {
+            'match': analytics.match_info,
+            'batting': analytics.batting,
+            'bowling': analytics.bowling.reset_index(),
+            'partnerships': analytics.partnerships,
+            'dismissals': analytics.dismissals,
+        }
+    if parts[1:] == ['win_probability']:
+        return win_probability(match_id, data_version())
+    raise ApiError(404, f"Unknown match resource: {'/'.join(parts[1:])}")
+
+
+def resolve(path, query):
+    parts = [unquote(part) for part in path.strip('/').split('/') if part]
+    if not parts:
+        return {'resources': sorted(list(ENTITIES) + ['matches'])}
+    if parts[0] in ENTITIES:
+        return _entity(parts[0], parts[1:], query)
+    if parts[0] == 'matches':
+        return _match(parts[1:], query)
+    raise ApiError(404, f"Unknown resource: {parts[0]}")
+
+
+class Response:
+    def __init__(self, etag, body):
+        self.etag = etag
+        self.body = body
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class ResponseCache:
+    # Rendered responses by (path, query); an entry rendered under an older
+    # data version is never served and ages out of the LRU
+    def __init__(self, max_entries=RESPONSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None or response.etag != etag:
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def etag_for(version, key):
+    return '"' + hashlib.sha1(repr((version, key)).encode()).hexdigest()[:24] + '"'
+
+
+def _etag_matches(header, etag):
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    # Weak comparison: a proxy that re-encodes the body may add W/
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _accepts_gzip(header):
+    # Accept-Encoding with its q-values: gzip named outright decides, else *
+    # does; q=0 refuses the coding
+    weights = {}
+    for item in (header or '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    weight = weights.get('gzip', weights.get('x-gzip', weights.get('*', 0.0)))
+    return weight > 0
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "IPLAnalyticsAPI/1.0"
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def _respond(self, head):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+        key = (url.path.rstrip('/') or '/', tuple(sorted(query.items())))
+        etag = etag_for(data_version(), key)
+
+        # The path is resolved (or found rendered under this version) before
+        # If-None-Match is honoured, so an invalid one never gets a 304
+        response = response_cache.get(key, etag)
+        cache = 'hit' if response is not None else 'miss'
+        if response is None:
+            try:
+                result = resolve(url.path, query)
+            except ApiError as exc:
+                self._error(exc.status, str(exc))
+                return
+            except Exception:
+                logger.exception("Failed to serve %s", self.path)
+                self._error(500, "Internal error")
+                return
+            body = json.dumps(_jsonable(result), separators=(',', ':'), default=str).encode()
+            response = Response(etag, body)
+            response_cache.put(key, response)
+
+        if _etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self._record(key, started, 0, 'not_modified')
+            return
+
+        body = response.body
+        accepts_gzip = _accepts_gzip(self.headers.get('Accept-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if accepts_gzip and len(body) >= GZIP_MIN_BYTES:
+            body = response.gzipped()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+        self._record(key, started, len(body), cache)
+
+    def _error(self, status, message):
+        body = json.dumps({'error': message}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _record(self, key, started, nbytes, cache):
+        # Grouped by collection, so the diagnostics page shows one row each
+        name = 'api/' + (key[0].strip('/').split('/')[0] or 'index')
+        recorder.record(name, 'api', time.perf_counter() - started,
+                        params={'path': key[0], 'query': key[1]}, nbytes=nbytes, cache=cache)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(host=API_HOST, port=API_PORT):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard's analytics as a read-only JSON API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = serve(args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m utils.api [--host HOST] [--port PORT]
+    sys.exit(main())
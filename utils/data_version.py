@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import numpy as np
+from utils.db_connections import execute
+from utils.queries import data_version_query
+
+# How often, at most, the database is asked whether new data has landed
+VERSION_CHECK_SECONDS = float(os.environ.get("IPL_VERSION_CHECK_SECONDS", 60))
+
+_lock = threading.Lock()
+_checked_at = None
+_version = None
+
+
+def _read_version():
+    snapshot_dir = os.environ.get("IPL_SNAPSHOT_DIR")
+    if snapshot_dir:
+        return ('snapshot', os.path.getmtime(os.path.join(snapshot_dir, "manifest.json")))
+    row = execute(data_version_query).iloc[0]
+    return (int(row['max_match_id']), int(row['matches']), int(row['load_seq']))
+
+
+def data_version():
+    # Cheap token that changes whenever a load adds, removes or corrects
+    # matches; it is re-read at most every VERSION_CHECK_SECONDS and folded
+    # into cache keys
+    global _checked_at, _version
+    with _lock:
+        now = time.monotonic()
+        if _version is None or now - _checked_at >= VERSION_CHECK_SECONDS:
+            _version = _read_version()
+            _checked_at = now
+        return _version
+
+
+def entity_version(kind, name):
+    # Version of one team, venue, player or match: the number, latest id and
+    # total revision of the matches it appears in. Entities a load did not
+    # touch keep their version, so their cached results survive the reload.
+    # A player's also carries the home-venue map behind the Home/Away filter,
+    # which any load can shift.
+    from utils.filters import get_filter_index
+    from utils.store import get_store
+    from utils.player_index import get_player_index, ROLES
+
+    store = get_store()
+    matches = store.matches
+    if kind == 'team':
+        match_ids = matches['match_id'][matches.equals('team_1', name) | matches.equals('team_2', name)]
+    elif kind == 'venue':
+        match_ids = matches['match_id'][matches.equals('venue', name)]
+    elif kind == 'player':
+        index = get_player_index()
+        rows = np.concatenate([index.rows(name, role) for role in ROLES])
+        match_ids = np.union1d(store.deliveries['match_id'][rows],
+                               matches['match_id'][matches.equals('player_of_match', name)])
+    elif kind == 'match':
+        match_ids = np.array([name])
+    else:
+        raise ValueError(f"Unknown entity kind: {kind}")
+    match_ids = np.unique(match_ids)
+    rows = np.searchsorted(matches['match_id'], match_ids)
+    rows = rows[(rows < len(matches)) & (matches['match_id'][np.minimum(rows, len(matches) - 1)] == match_ids)]
+    revisions = matches['revision'][rows]
+    version = (len(match_ids), int(match_ids.max()) if len(match_ids) else 0, int(revisions.sum()))
+    if kind == 'player':
+        version += (get_filter_index().home_version,)
+    return version
@@ -1,12 +1,135 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import psycopg2
-import pandas as pd
+import psycopg2.extensions
 import streamlit as st
+from utils.queries import Query
+from utils.instrumentation import record_query
+from utils.result_cache import cached_result
+from utils.engines import get_engine
 
-db = st.secrets["database"]
 
-@st.cache_resource
-def get_connection():
-    return psycopg2.connect(
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class ConnectionPool:
+    def __init__(self, minconn=1, maxconn=10, timeout=30.0, probe_interval=30.0, **params):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self._params = params
+        self._idle = []  # (connection, last checked in) pairs, most recent last
+        self._size = 0
+        self._waits = 0
+        self._cond = threading.Condition()
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self._params)
+        conn.autocommit = True
+        return conn
+
+    def _alive(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.probe_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            while not self._idle and self._size >= self.maxconn:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._waits += 1
+                self._cond.wait(remaining)
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._size += 1
+
+        try:
+            if conn is None or not self._alive(conn, last_used):
+                if conn is not None:
+                    conn.close()
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, broken=False):
+        if not broken and not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        with self._cond:
+            if broken or conn.closed or self._size > self.maxconn:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, broken=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max': self.maxconn,
+                'waits': self._waits,
+            }
+
+    def closeall(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+
+def database_params():
+    db = st.secrets["database"]
+    return dict(
         host=db["host"],
         database=db["name"],
         user=db["user"],
@@ -14,3 +137,73 @@ def get_connection():
         port=db["port"],
         sslmode=db["sslmode"],
     )
+
+
+@st.cache_resource
+def get_pool():
+    db = st.secrets["database"]
+    return ConnectionPool(
+        minconn=db.get("pool_min", 1),
+        maxconn=db.get("pool_max", 10),
+        timeout=db.get("pool_timeout", 30.0),
+        probe_interval=db.get("pool_probe_interval", 30.0),
+        **database_params(),
+    )
+
+
+def connect(dsn=None):
+    # A dedicated connection outside the pool, for batch jobs such as
+    # migrations and ingestion; dsn overrides the configured database
+    if dsn:
+        return psycopg2.connect(dsn)
+    return psycopg2.connect(**database_params())
+
+
+@contextmanager
+def connection(timeout=None):
+    with get_pool().connection(timeout) as conn:
+        yield conn
+
+
+# Called as hook(query, params, seconds, df, nbytes, cache) after every
+# registry query, and for each query of a run_queries batch served from the
+# result cache; nbytes is the size of the COPY stream, or None when not
+# known, and cache is 'hit', 'miss' or None for calls that bypass the cache
+query_hooks = [record_query]
+
+
+def _run(method, query, params, cache=None):
+    values = query.bind(**params)
+    started = time.perf_counter()
+    df, nbytes = getattr(get_engine(), method)(query, values)
+    elapsed = time.perf_counter() - started
+    for hook in query_hooks:
+        hook(query, params, elapsed, df, nbytes, cache)
+    return df
+
+
+def execute(query, **params):
+    return _run('execute', query, params)
+
+
+def read_copy(query, **params):
+    # Bulk read of a large result with the engine's fastest path (COPY on Postgres)
+    return _run('read_copy', query, params)
+
+
+def _batch_hit(arguments, results, seconds):
+    # A batch served from the result cache never reaches the engine; its
+    # queries are still recorded, as hits
+    for name, query in arguments['queries'].items():
+        for hook in query_hooks:
+            hook(query, {}, seconds, results[name], None, 'hit')
+
+
+@cached_result(hash_funcs={Query: lambda query: (query.name, query.sql)}, on_hit=_batch_hit)
+def run_queries(queries, version=None):
+    # Run a named batch of independent queries concurrently, one pooled
+    # connection per worker, and return the DataFrames under the same names
+    workers = max(1, min(len(queries), get_engine().max_workers))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(_run, 'execute', query, {}, 'miss') for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,225 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Where registry queries run. PostgresEngine sends them to the database
+# through the connection pool; DuckDBEngine runs the same SQL in-process over
+# a local snapshot, so the dashboard works with no database server at all.
+# IPL_ENGINE picks one; by default a configured snapshot means DuckDB.
+
+
+class _CountingWriter:
+    def __init__(self, raw):
+        self.raw = raw
+        self.nbytes = 0
+
+    def write(self, data):
+        self.nbytes += len(data)
+        return self.raw.write(data)
+
+    def close(self):
+        self.raw.close()
+
+
+def _copy_out(conn, sql, writer, failures):
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(sql, writer)
+    except BaseException as exc:
+        failures.append(exc)
+    try:
+        writer.close()
+    except BrokenPipeError as exc:
+        # The reader gave up first; flushing the tail had nowhere to go
+        failures.append(exc)
+
+
+class PostgresEngine:
+    name = 'postgres'
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.max_workers = pool.maxconn
+
+    def execute(self, query, values):
+        # Returns the frame and the bytes read, None where the driver does not say
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                if query.name not in conn.prepared:
+                    cur.execute(query.prepare_sql())
+                    conn.prepared.add(query.name)
+                cur.execute(query.execute_sql(), values)
+                columns = [column.name for column in cur.description]
+                return pd.DataFrame.from_records(cur.fetchall(), columns=columns, coerce_float=True), None
+
+    def read_copy(self, query, values):
+        # Bulk path for large results: COPY ... TO STDOUT as CSV parsed straight
+        # into typed columns, skipping per-row Python tuples. The COPY writes
+        # into a pipe from a second thread while read_csv parses from the
+        # other end, so the CSV text is never held in memory whole.
+        read_fd, write_fd = os.pipe()
+        reader = os.fdopen(read_fd, 'rb')
+        writer = _CountingWriter(os.fdopen(write_fd, 'wb'))
+        failures = []
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                sql = cur.mogrify(query.copy_sql(), query.copy_params(values)).decode()
+            thread = threading.Thread(target=_copy_out, args=(conn, sql, writer, failures),
+                                      name="copy-out", daemon=True)
+            thread.start()
+            try:
+                df = query.read_csv(reader)
+            except BaseException:
+                # Closing the read end stops a copy still writing; the
+                # connection is dropped as it may be left mid-COPY
+                reader.close()
+                thread.join()
+                conn.close()
+                if failures and not isinstance(failures[0], BrokenPipeError):
+                    raise failures[0]
+                raise
+            reader.close()
+            thread.join()
+            if failures:
+                raise failures[0]
+        return df, writer.nbytes
+
+    def stats(self):
+        return dict(self.pool.stats(), engine=self.name)
+
+
+class DuckDBEngine:
+    name = 'duckdb'
+    max_workers = os.cpu_count() or 4
+
+    def __init__(self, directory):
+        import duckdb
+        from utils.aggregates import AGGREGATES, select_sql
+        from utils.snapshot import load_snapshot
+        from utils.queries import store_deliveries_query, store_matches_query
+
+        store = load_snapshot(directory)
+        self.directory = directory
+        self._db = duckdb.connect()
+        self._db.execute("CREATE SCHEMA IF NOT EXISTS public")
+        # Rebuild the Postgres tables from the snapshot's columns; categorical
+        # codes become strings and DuckDB dictionary-compresses them again
+        self._load_table('deliveries', store.deliveries, list(store_deliveries_query.schema))
+        self._load_table('matches', store.matches,
+                         [column for column in store_matches_query.schema if column != 'revision'])
+        d = store.deliveries
+        starts = np.flatnonzero(np.r_[True, (np.diff(d['match_id']) != 0) | (np.diff(d['inning']) != 0)])
+        self._load_frame('innings', pd.DataFrame({
+            'match_id': d['match_id'][starts],
+            'inning': d['inning'][starts],
+            'batting_team': pd.Categorical.from_codes(d['batting_team'][starts],
+                                                      pd.Index(d.labels('batting_team')).astype(str)),
+        }))
+        self._load_frame('ingest_manifest', pd.DataFrame({
+            'match_id': store.matches['match_id'],
+            'revision': store.matches['revision'],
+            'load_seq': np.zeros(len(store.matches), dtype=np.int64),
+        }))
+        self._load_frame('players', pd.DataFrame({'player_name': store.player_names}))
+        self._load_frame('teams', pd.DataFrame({'team_name': store.team_names}))
+        # The aggregate tables ingestion maintains in Postgres, computed in full
+        for table in AGGREGATES:
+            self._db.execute(f"CREATE TABLE public.{table} AS {select_sql(table)}")
+        self._lock = threading.Lock()
+        self._in_use = 0
+
+    def _load_table(self, name, table, columns):
+        data = {}
+        for column in columns:
+            values = table[column]
+            if column in table.categories:
+                vocabulary = table.vocabularies[table.categories[column]]
+                values = pd.Categorical.from_codes(values, pd.Index(vocabulary).astype(str))
+            data[column] = values
+        self._load_frame(name, pd.DataFrame(data))
+
+    def _load_frame(self, name, df):
+        casts = ', '.join(
+            f"{column}::VARCHAR AS {column}" if isinstance(df[column].dtype, pd.CategoricalDtype)
+            else f"{column}::DATE AS {column}" if column.endswith('_date')
+            else column
+            for column in df.columns)
+        self._db.register('snapshot_frame', df)
+        try:
+            self._db.execute(f"CREATE TABLE public.{name} AS SELECT {casts} FROM snapshot_frame")
+        finally:
+            self._db.unregister('snapshot_frame')
+
+    def _cursor(self):
+        cur = self._db.cursor()
+        cur.execute("SET search_path = 'public'")
+        return cur
+
+    def execute(self, query, values):
+        with self._lock:
+            self._in_use += 1
+        try:
+            cur = self._cursor()
+            try:
+                result = cur.execute(query.sql, list(values))
+                # SUM over integers is HUGEINT here, which pandas gets as float;
+                # Postgres returns bigint, so those columns go back to int64
+                huge = [column[0] for column in result.description if str(column[1]) == 'HUGEINT']
+                df = result.fetchdf()
+            finally:
+                cur.close()
+        finally:
+            with self._lock:
+                self._in_use -= 1
+        for column in huge:
+            if df[column].notnull().all():
+                df[column] = df[column].astype('int64')
+        # Postgres folds unquoted aliases to lower case; DuckDB keeps them as written
+        df.columns = [column.lower() for column in df.columns]
+        return df, None
+
+    def read_copy(self, query, values):
+        df, nbytes = self.execute(query, values)
+        dtypes = {column: kind for column, kind in query.schema.items() if kind != 'date'}
+        return df.astype(dtypes), nbytes
+
+    def stats(self):
+        with self._lock:
+            return {'engine': self.name, 'in_use': self._in_use, 'max': self.max_workers}
+
+
+def engine_name():
+    name = os.environ.get("IPL_ENGINE")
+    if name:
+        return name
+    return 'duckdb' if os.environ.get("IPL_SNAPSHOT_DIR") else 'postgres'
+
+
+def get_engine():
+    name = engine_name()
+    if name == 'postgres':
+        return _postgres_engine()
+    if name == 'duckdb':
+        directory = os.environ.get("IPL_SNAPSHOT_DIR", "snapshot")
+        # Keyed on the manifest's mtime so a re-exported snapshot is picked up
+        return _duckdb_engine(directory, os.path.getmtime(os.path.join(directory, "manifest.json")))
+    raise ValueError(f"Unknown IPL_ENGINE: {name}")
+
+
+@st.cache_resource
+def _postgres_engine():
+    from utils.db_connections import get_pool
+    from utils.migrations import require_current
+
+    pool = get_pool()
+    with pool.connection() as conn:
+        require_current(conn)
+    return PostgresEngine(pool)
+
+
+@st.cache_resource(max_entries=1)
+def _duckdb_engine(directory, snapshot_mtime):
+    return DuckDBEngine(directory)
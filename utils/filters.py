@@ -0,0 +1,92 @@
+import hashlib
+import threading
+
+import numpy as np
+from utils.store import get_store
+
+SIDES = ['batting', 'bowling']
+
+
+def _bit(bitmap, rows):
+    # Test the bits of packed (big-endian) bitmap at the given row offsets
+    return (bitmap[rows >> 3] >> (7 - (rows & 7)).astype(np.uint8)) & 1 == 1
+
+
+class FilterIndex:
+    # Packed bitmaps over the deliveries rows of where each side plays at home
+    # and away, built the first time they are asked for. A player's rows are
+    # filtered by testing their bits, with no per-filter query.
+    def __init__(self, store):
+        self.deliveries = d = store.deliveries
+        self.matches = m = store.matches
+        self.size = len(d)
+        self._bitmaps = {}
+        self._lock = threading.Lock()
+
+        # Sides per delivery: the batting team recorded for the innings, and
+        # whichever of the match's teams it is not
+        team_1, team_2 = m['team_1'], m['team_2']
+        match_row = d['match_row']
+        batting = d['batting_team']
+        bowling = np.where(batting == team_1[match_row], team_2[match_row],
+                           np.where(batting == team_2[match_row], team_1[match_row], -1))
+        self.teams = {'batting': batting, 'bowling': bowling.astype(np.int32)}
+
+        # A team's home venue is the venue it has played at most
+        n_teams, n_venues = len(m.labels('team_1')), len(m.labels('venue'))
+        teams = np.concatenate([team_1, team_2])
+        venues = np.concatenate([m['venue'], m['venue']])
+        known = (teams >= 0) & (venues >= 0)
+        counts = np.bincount(teams[known].astype(np.int64) * n_venues + venues[known],
+                             minlength=n_teams * n_venues).reshape(n_teams, n_venues)
+        self.home_venue = np.where(counts.max(axis=1) > 0, counts.argmax(axis=1), -1)
+        # The map is global, so results filtered by it are keyed by this too
+        self.home_version = hashlib.sha1(repr(sorted(self.home_venues().items())).encode()).hexdigest()[:16]
+
+    def home_venues(self):
+        labels = self.matches.labels('venue')
+        return {team: labels[venue] for team, venue in zip(self.matches.labels('team_1'), self.home_venue)
+                if venue >= 0}
+
+    def _build(self, key):
+        # At home: at the side's own home venue. Away: at the opponent's, so
+        # neutral venues and deliveries with an unknown side are neither
+        name, side = key
+        team = self.teams[side]
+        opponent = self.teams['bowling' if side == 'batting' else 'batting']
+        venue = np.where(self.deliveries['venue'] >= 0, self.deliveries['venue'], -2)
+        at_own = (team >= 0) & (self.home_venue[np.maximum(team, 0)] == venue)
+        at_opponents = (opponent >= 0) & (self.home_venue[np.maximum(opponent, 0)] == venue)
+        return np.packbits(at_own if name == 'home' else at_opponents & (team >= 0) & ~at_own)
+
+    def bitmap(self, name, side):
+        key = (name, side)
+        with self._lock:
+            if key not in self._bitmaps:
+                self._bitmaps[key] = self._build(key)
+            return self._bitmaps[key]
+
+    def mask(self, side='batting', home=None):
+        # Packed bitmap of the deliveries where the given side plays at its
+        # home venue (home=True) or at its opponent's (home=False)
+        if home is None:
+            return None
+        return self.bitmap('home' if home else 'away', side)
+
+    def select(self, rows, side='batting', home=None):
+        # The subset of rows that pass the filter
+        bitmap = self.mask(side=side, home=home)
+        if bitmap is None or len(rows) == 0:
+            return rows
+        return rows[_bit(bitmap, np.asarray(rows))]
+
+    def rows(self, side='batting', home=None):
+        # Every row passing the filter
+        bitmap = self.mask(side=side, home=home)
+        if bitmap is None:
+            return np.arange(self.size)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+
+def get_filter_index():
+    return get_store().derived('filter_index', FilterIndex)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from utils.store import get_store
+
+METRICS = ['runs', 'balls', 'dismissals', 'dots', 'fours', 'sixes']
+
+
+class HeadToHead:
+    # Sparse batter x bowler matrix in coordinate form: one entry per pair that
+    # ever met, sorted by (batter, bowler), with CSR offsets over batters and a
+    # bowler-ordered permutation with its own offsets, so either direction is
+    # a slice of length nnz(row)
+    def __init__(self, store):
+        d = self.deliveries = store.deliveries
+        self.players = d.labels('batter')
+        size = len(self.players)
+        batter, bowler = d['batter'], d['bowler']
+        met = (batter >= 0) & (bowler >= 0)
+        runs, extras = d['runs_batter'][met], d['runs_extras'][met]
+        # Dismissals credited to the bowler: every wicket except run outs
+        dismissed = (d['wicket'] & ~d.equals('dismissal_kind', 'run out'))[met]
+
+        pairs, inverse = np.unique(batter[met].astype(np.int64) * size + bowler[met], return_inverse=True)
+        self.batter = (pairs // size).astype(np.int32)
+        self.bowler = (pairs % size).astype(np.int32)
+        nnz = len(pairs)
+        self.values = {
+            'runs': np.bincount(inverse, weights=runs, minlength=nnz).astype(np.int32),
+            'balls': np.bincount(inverse, minlength=nnz).astype(np.int32),
+            'dismissals': np.bincount(inverse, weights=dismissed, minlength=nnz).astype(np.int32),
+            'dots': np.bincount(inverse, weights=(runs == 0) & (extras == 0), minlength=nnz).astype(np.int32),
+            'fours': np.bincount(inverse, weights=runs == 4, minlength=nnz).astype(np.int32),
+            'sixes': np.bincount(inverse, weights=runs == 6, minlength=nnz).astype(np.int32),
+        }
+        self.batter_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.batter, minlength=size))])
+        self.by_bowler = np.argsort(self.bowler, kind='stable')
+        self.bowler_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.bowler, minlength=size))])
+
+    def __len__(self):
+        return len(self.batter)
+
+    def _frame(self, entries, opponent, n, min_balls, sort):
+        df = pd.DataFrame({opponent: self.players[(self.bowler if opponent == 'bowler' else self.batter)[entries]]})
+        for metric in METRICS:
+            df[metric] = self.values[metric][entries]
+        df = df[df['balls'] >= min_balls]
+        df['strike_rate'] = (df['runs'] * 100.0 / df['balls']).round(2)
+        if sort:
+            df = df.nlargest(n, sort) if n else df.sort_values(sort, ascending=False, kind='stable')
+        elif n:
+            df = df.head(n)
+        return df.reset_index(drop=True)
+
+    def vs_bowlers(self, batter_name, n=None, min_balls=0, sort='runs'):
+        # One batter's record against every bowler they faced
+        code = self.deliveries.code('batter', batter_name)
+        if code < 0:
+            entries = np.empty(0, dtype=np.int64)
+        else:
+            entries = np.arange(self.batter_offsets[code], self.batter_offsets[code + 1])
+        return self._frame(entries, 'bowler', n, min_balls, sort)
+
+    def vs_batters(self, bowler_name, n=None, min_balls=0, sort='runs'):
+        # One bowler's record against every batter they bowled to
+        code = self.deliveries.code('bowler', bowler_name)
+        if code < 0:
+            entries = np.empty(0, dtype=np.int64)
+        else:
+            entries = self.by_bowler[self.bowler_offsets[code]:self.bowler_offsets[code + 1]]
+        return self._frame(entries, 'batter', n, min_balls, sort)
+
+    def pair(self, batter_name, bowler_name):
+        df = self.vs_bowlers(batter_name, sort=None)
+        row = df[df['bowler'] == bowler_name]
+        return row.iloc[0] if len(row) else None
+
+    def matrix(self, min_balls=0):
+        # Every pair that met at least min_balls times, in coordinate form
+        keep = np.flatnonzero(self.values['balls'] >= min_balls)
+        df = pd.DataFrame({'batter': self.players[self.batter[keep]], 'bowler': self.players[self.bowler[keep]]})
+        for metric in METRICS:
+            df[metric] = self.values[metric][keep]
+        return df
+
+
+def get_head_to_head():
+    return get_store().derived('head_to_head', HeadToHead)
@@ -0,0 +1,388 @@
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.aggregates import apply_delta
+
+# Loads Cricsheet ball-by-ball match files (JSON, or the older YAML format)
+# into matches, innings, deliveries, players and teams. Files are parsed in a process
+# pool, a few dozen per task, straight into CSV text; the parent streams that
+# into COPY ... FROM STDIN and commits every BATCH_ROWS deliveries, so memory
+# stays bounded by the batch size and the number of tasks in flight.
+MATCH_COLUMNS = ['match_id', 'season', 'match_date', 'city', 'venue', 'team_1', 'team_2',
+                 'toss_winner', 'toss_decision', 'winner', 'player_of_match']
+INNINGS_COLUMNS = ['match_id', 'inning', 'batting_team']
+DELIVERY_COLUMNS = ['match_id', 'inning', 'over_number', 'ball_number', 'batter', 'bowler', 'non_striker',
+                    'runs_batter', 'runs_extras', 'runs_total', 'wicket', 'dismissal_kind', 'fielder']
+FILES_PER_TASK = 32
+BATCH_ROWS = 500_000
+SOURCE_SUFFIXES = ('.json', '.yaml', '.yml')
+
+
+def _load_file(path):
+    # The parsed match and a digest of the raw file, which tells a corrected
+    # re-release of a match apart from the copy already loaded
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    if path.endswith('.json'):
+        return json.loads(data), digest
+    import yaml
+    return yaml.load(data, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)), digest
+
+
+def _winner(outcome):
+    if 'winner' in outcome:
+        return outcome['winner']
+    if 'eliminator' in outcome:
+        # Ties decided by a super over
+        return outcome['eliminator']
+    if outcome.get('result') == 'no result':
+        return 'No Result'
+    return None
+
+
+def _match_row(match_id, info):
+    teams = info['teams']
+    toss = info.get('toss', {})
+    player_of_match = info.get('player_of_match') or [None]
+    return [
+        match_id,
+        str(info.get('season', str(info['dates'][0])[:4])),
+        str(info['dates'][0]),
+        info.get('city'),
+        info.get('venue'),
+        teams[0],
+        teams[1],
+        toss.get('winner'),
+        toss.get('decision'),
+        _winner(info.get('outcome', {})),
+        player_of_match[0],
+    ]
+
+
+def _innings_deliveries(innings):
+    # (over index, delivery) pairs for both source layouts. JSON (v2) nests
+    # deliveries under numbered overs; YAML (v1) keys each ball as over.ball
+    if 'overs' in innings:
+        for over in innings['overs']:
+            for delivery in over['deliveries']:
+                yield over['over'], delivery
+        return
+    for ball in innings.get('deliveries', []):
+        (key, delivery), = ball.items()
+        v1 = dict(delivery, batter=delivery.get('batsman'),
+                  runs={'batter': delivery['runs']['batsman'], 'extras': delivery['runs']['extras'],
+                        'total': delivery['runs']['total']})
+        if 'wicket' in delivery:
+            wickets = delivery['wicket'] if isinstance(delivery['wicket'], list) else [delivery['wicket']]
+            v1['wickets'] = [dict(wicket, fielders=[{'name': name} for name in wicket.get('fielders', [])])
+                             for wicket in wickets]
+        yield int(float(key)), v1
+
+
+def _innings(match):
+    for inning, innings in enumerate(match.get('innings', []), start=1):
+        if 'team' not in innings and len(innings) == 1:
+            # YAML: [{'1st innings': {...}}]
+            innings = next(iter(innings.values()))
+        yield inning, innings
+
+
+def _innings_rows(match_id, match):
+    # The side batting in each innings, as the file records it
+    return [[match_id, inning, innings.get('team')] for inning, innings in _innings(match)]
+
+
+def _delivery_rows(match_id, match):
+    rows = []
+    for inning, innings in _innings(match):
+        ball_number, current_over = 0, None
+        for over, delivery in _innings_deliveries(innings):
+            if over != current_over:
+                ball_number, current_over = 0, over
+            ball_number += 1
+            runs = delivery['runs']
+            wickets = delivery.get('wickets') or [{}]
+            wicket = wickets[0]
+            fielders = wicket.get('fielders') or [{}]
+            rows.append([
+                match_id, inning, over + 1, ball_number,
+                delivery['batter'], delivery['bowler'], delivery['non_striker'],
+                runs['batter'], runs['extras'], runs['total'],
+                't' if 'kind' in wicket else 'f',
+                wicket.get('kind'),
+                fielders[0].get('name'),
+            ])
+    return rows
+
+
+def parse_files(paths):
+    # Worker task: parse a group of files into CSV text for matches, innings
+    # and deliveries, plus the player and team names they mention
+    matches, innings, deliveries = io.StringIO(), io.StringIO(), io.StringIO()
+    match_writer = csv.writer(matches, lineterminator='\n')
+    innings_writer = csv.writer(innings, lineterminator='\n')
+    delivery_writer = csv.writer(deliveries, lineterminator='\n')
+    players, teams, match_ids, digests, errors = set(), set(), [], [], []
+    innings_counts, delivery_counts = [], []
+    n_deliveries = 0
+    for path in paths:
+        try:
+            match_id = int(os.path.splitext(os.path.basename(path))[0])
+            match, digest = _load_file(path)
+            info = match['info']
+            match_row = _match_row(match_id, info)
+            innings_rows = _innings_rows(match_id, match)
+            rows = _delivery_rows(match_id, match)
+        except Exception as exc:
+            errors.append((path, f"{type(exc).__name__}: {exc}"))
+            continue
+        match_writer.writerow(match_row)
+        innings_writer.writerows(innings_rows)
+        delivery_writer.writerows(rows)
+        n_deliveries += len(rows)
+        match_ids.append(match_id)
+        digests.append(digest)
+        innings_counts.append(len(innings_rows))
+        delivery_counts.append(len(rows))
+        teams.update(info['teams'])
+        for squad in info.get('players', {}).values():
+            players.update(squad)
+        for row in rows:
+            players.update(name for name in (row[4], row[5], row[6], row[12]) if name)
+    return {
+        'matches': matches.getvalue(),
+        'innings': innings.getvalue(),
+        'deliveries': deliveries.getvalue(),
+        'match_ids': match_ids,
+        'digests': digests,
+        'innings_counts': innings_counts,
+        'delivery_counts': delivery_counts,
+        'n_deliveries': n_deliveries,
+        'players': players,
+        'teams': teams,
+        'errors': errors,
+    }
+
+
+def _keep_rows(text, counts, keep):
+    # The CSV rows of the files at the kept positions; counts holds each
+    # file's number of rows. Re-read with the csv module, as quoted names may
+    # hold line breaks or separators that str.splitlines would split on.
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    reader = csv.reader(io.StringIO(text, newline=''))
+    for position, count in enumerate(counts):
+        rows = itertools.islice(reader, count)
+        if position in keep:
+            writer.writerows(rows)
+        else:
+            for _ in rows:
+                pass
+    return out.getvalue()
+
+
+def source_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                if entry.is_file() and entry.name.endswith(SOURCE_SUFFIXES):
+                    yield entry.path
+        else:
+            yield path
+
+
+class Loader:
+    # Buffers worker output and flushes it to Postgres with COPY. Every loaded
+    # match is recorded in ingest_manifest with the digest of its source file,
+    # so a re-run loads only what is new or corrected: unchanged matches are
+    # skipped, and a corrected match has its old rows replaced and its
+    # revision bumped. The aggregate tables get the matching deltas in the
+    # same transaction.
+    def __init__(self, conn, batch_rows=BATCH_ROWS):
+        self.conn = conn
+        self.batch_rows = batch_rows
+        with conn.cursor() as cur:
+            cur.execute("SELECT match_id FROM public.matches")
+            loaded = {row[0] for row in cur.fetchall()}
+            cur.execute("SELECT match_id, digest, revision FROM public.ingest_manifest")
+            self.manifest = {match_id: (digest, revision) for match_id, digest, revision in cur.fetchall()}
+            # Matches loaded before the manifest existed count as revision 0 of an unknown file
+            for match_id in loaded - self.manifest.keys():
+                self.manifest[match_id] = (None, 0)
+            cur.execute("SELECT player_name FROM public.players")
+            self.known_players = {row[0] for row in cur.fetchall()}
+            cur.execute("SELECT team_name FROM public.teams")
+            self.known_teams = {row[0] for row in cur.fetchall()}
+            cur.execute("SELECT nextval('public.ingest_load_seq')")
+            self.load_seq = cur.fetchone()[0]
+        conn.commit()
+        self._reset()
+        self.matches = 0
+        self.corrected = 0
+        self.deliveries = 0
+        self.skipped = 0
+        self.errors = []
+        self.touched = set()
+
+    def _reset(self):
+        self._buffers = {'matches': io.StringIO(), 'innings': io.StringIO(), 'deliveries': io.StringIO()}
+        self._players, self._teams = set(), set()
+        self._fresh, self._corrected, self._digests = [], [], {}
+        self._rows = 0
+
+    def add(self, result):
+        self.errors.extend(result['errors'])
+        # Positions of the files to load; a match_id seen earlier in the batch,
+        # in this result or an earlier one, keeps its first copy
+        keep = set()
+        for position, (match_id, digest) in enumerate(zip(result['match_ids'], result['digests'])):
+            if match_id in self._digests:
+                continue
+            known = self.manifest.get(match_id)
+            if known is None:
+                self._fresh.append(match_id)
+            elif known[0] != digest:
+                self._corrected.append(match_id)
+            else:
+                continue
+            self._digests[match_id] = digest
+            keep.add(position)
+        if len(keep) < len(result['match_ids']):
+            # Keep only the rows of matches that are new or corrected
+            self.skipped += len(result['match_ids']) - len(keep)
+            counts = result['delivery_counts']
+            result['matches'] = _keep_rows(result['matches'], [1] * len(counts), keep)
+            result['innings'] = _keep_rows(result['innings'], result['innings_counts'], keep)
+            result['deliveries'] = _keep_rows(result['deliveries'], counts, keep)
+            result['n_deliveries'] = sum(counts[position] for position in keep)
+        self._buffers['matches'].write(result['matches'])
+        self._buffers['innings'].write(result['innings'])
+        self._buffers['deliveries'].write(result['deliveries'])
+        self._players |= result['players'] - self.known_players
+        self._teams |= result['teams'] - self.known_teams
+        self._rows += result['n_deliveries']
+        self.deliveries += result['n_deliveries']
+        if self._rows >= self.batch_rows:
+            self.flush()
+
+    def _copy(self, cur, table, columns, buffer):
+        buffer.seek(0)
+        cur.copy_expert(f"COPY public.{table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def flush(self):
+        # One transaction per batch: a failed batch leaves no partial matches
+        # behind, and the aggregates never disagree with the deliveries
+        if not self._digests:
+            return
+        changed = self._fresh + self._corrected
+        with self.conn.cursor() as cur:
+            if self._corrected:
+                apply_delta(cur, self._corrected, -1)
+                cur.execute("DELETE FROM public.deliveries WHERE match_id = ANY(%s)", (self._corrected,))
+                cur.execute("DELETE FROM public.innings WHERE match_id = ANY(%s)", (self._corrected,))
+                cur.execute("DELETE FROM public.matches WHERE match_id = ANY(%s)", (self._corrected,))
+            for table, column, names in (('players', 'player_name', self._players),
+                                         ('teams', 'team_name', self._teams)):
+                if names:
+                    buffer = io.StringIO()
+                    csv.writer(buffer, lineterminator='\n').writerows([name] for name in sorted(names))
+                    self._copy(cur, table, [column], buffer)
+            self._copy(cur, 'matches', MATCH_COLUMNS, self._buffers['matches'])
+            self._copy(cur, 'innings', INNINGS_COLUMNS, self._buffers['innings'])
+            self._copy(cur, 'deliveries', DELIVERY_COLUMNS, self._buffers['deliveries'])
+            apply_delta(cur, changed, 1)
+            revisions = [self.manifest[match_id][1] + 1 if match_id in self.manifest else 0 for match_id in changed]
+            cur.execute("""
+                INSERT INTO public.ingest_manifest (match_id, digest, revision, load_seq)
+                SELECT * FROM unnest(%s::bigint[], %s::text[], %s::int[]), (SELECT %s::bigint) seq
+                ON CONFLICT (match_id) DO UPDATE
+                SET digest = EXCLUDED.digest, revision = EXCLUDED.revision,
+                    load_seq = EXCLUDED.load_seq, loaded_at = now()
+            """, (changed, [self._digests[match_id] for match_id in changed], revisions, self.load_seq))
+        self.conn.commit()
+        for match_id, revision in zip(changed, revisions):
+            self.manifest[match_id] = (self._digests[match_id], revision)
+        self.known_players |= self._players
+        self.known_teams |= self._teams
+        self.matches += len(self._fresh)
+        self.corrected += len(self._corrected)
+        self.touched.update(changed)
+        self._reset()
+
+
+def ingest(paths, conn, workers=None, files_per_task=FILES_PER_TASK, batch_rows=BATCH_ROWS, progress=None):
+    # Parse in a process pool with a bounded number of tasks in flight, so
+    # parsed-but-unloaded data never grows past a few batches
+    files = list(source_files(paths))
+    tasks = (files[i:i + files_per_task] for i in range(0, len(files), files_per_task))
+    workers = workers or os.cpu_count() or 1
+    loader = Loader(conn, batch_rows)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(parse_files, task))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    loader.add(future.result())
+                if progress:
+                    progress(loader, time.perf_counter() - started)
+        for future in pending:
+            loader.add(future.result())
+    loader.flush()
+    elapsed = time.perf_counter() - started
+    return {
+        'files': len(files),
+        'matches': loader.matches,
+        'corrected': loader.corrected,
+        'deliveries': loader.deliveries,
+        'touched': sorted(loader.touched),
+        'skipped': loader.skipped,
+        'errors': loader.errors,
+        'seconds': elapsed,
+        'matches_per_second': loader.matches / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load Cricsheet ball-by-ball files into the database")
+    parser.add_argument("paths", nargs="+", help="match files, or directories of them")
+    parser.add_argument("--dsn", help="database to load instead of the app's configured one")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--files-per-task", type=int, default=FILES_PER_TASK)
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args(argv)
+
+    from utils.db_connections import connect
+
+    def progress(loader, seconds):
+        print(f"\r{loader.matches} matches, {loader.deliveries} deliveries, "
+              f"{loader.matches / seconds:.0f} matches/s", end="", file=sys.stderr)
+
+    conn = connect(args.dsn)
+    try:
+        result = ingest(args.paths, conn, args.workers, args.files_per_task, args.batch_rows, progress)
+    finally:
+        conn.close()
+    print(file=sys.stderr)
+    for path, error in result['errors']:
+        print(f"Skipped {path}: {error}", file=sys.stderr)
+    print(f"Loaded {result['matches']} matches ({result['deliveries']} deliveries) from {result['files']} files "
+          f"in {result['seconds']:.1f}s: {result['matches_per_second']:.0f} matches/s; "
+          f"{result['corrected']} corrected, {result['skipped']} unchanged")
+    return 1 if result['errors'] else 0
+
+
+if __name__ == "__main__":
+    # python -m utils.ingest <files or directories> [--dsn ...]
+    sys.exit(main())
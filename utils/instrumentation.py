@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+
+# In-process record of every database call and cached loader call. Events go
+# into a fixed-size ring buffer, so memory stays flat however long the
+# process runs; histograms and summaries are computed from it on demand.
+RING_SIZE = int(os.environ.get("IPL_INSTRUMENTATION_RING_SIZE", 10_000))
+# Upper edges of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def params_hash(params):
+    # Short stable digest of a call's parameters, so distinct calls can be told
+    # apart without keeping player or team names in the buffer
+    if not params:
+        return ''
+    encoded = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+class Recorder:
+    def __init__(self, size=RING_SIZE):
+        self._events = deque(maxlen=size)
+        self._cache = Counter()
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, name, kind, seconds, params=None, rows=None, nbytes=None, cache=None):
+        event = {
+            'at': time.time(),
+            'name': name,
+            'kind': kind,
+            'params_hash': params_hash(params),
+            'ms': seconds * 1000,
+            'rows': rows,
+            'bytes': nbytes,
+            'cache': cache,
+        }
+        with self._lock:
+            self._events.append(event)
+            if cache is not None:
+                self._cache[(name, cache)] += 1
+
+    def events(self):
+        with self._lock:
+            return pd.DataFrame(list(self._events),
+                                columns=['at', 'name', 'kind', 'params_hash', 'ms', 'rows', 'bytes', 'cache'])
+
+    def slowest(self, n=20):
+        df = self.events()
+        summary = df.groupby(['name', 'kind']).agg(
+            calls=('ms', 'count'),
+            p50_ms=('ms', 'median'),
+            p95_ms=('ms', lambda ms: np.percentile(ms, 95)),
+            max_ms=('ms', 'max'),
+            rows=('rows', 'mean'),
+            bytes=('bytes', 'mean'),
+        ).reset_index()
+        return summary.nlargest(n, 'p95_ms').reset_index(drop=True)
+
+    def cache_ratios(self):
+        # Counted since start-up rather than from the ring buffer, so heavy
+        # query traffic does not push the hit counts out
+        with self._lock:
+            counts = Counter(self._cache)
+        names = sorted({name for name, _ in counts})
+        df = pd.DataFrame({
+            'name': names,
+            'hits': [counts[(name, 'hit')] for name in names],
+            'misses': [counts[(name, 'miss')] for name in names],
+        })
+        df['hit_ratio'] = (df['hits'] / (df['hits'] + df['misses'])).round(3)
+        return df
+
+    def histograms(self):
+        # Per-name latency counts in LATENCY_BUCKETS_MS, plus an overflow bucket (edge None)
+        df = self.events()
+        edges = LATENCY_BUCKETS_MS + [None]
+        result = {}
+        for name, ms in df.groupby('name')['ms']:
+            counts = np.bincount(np.searchsorted(LATENCY_BUCKETS_MS, ms.to_numpy(), side='left'),
+                                 minlength=len(edges))
+            result[name] = {'le_ms': edges, 'counts': counts.tolist()}
+        return result
+
+    def export(self):
+        return json.dumps({
+            'started_at': self.started_at,
+            'exported_at': time.time(),
+            'histograms': self.histograms(),
+            'cache': self.cache_ratios().to_dict('records'),
+        }, default=str, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._cache.clear()
+
+
+recorder = Recorder()
+
+
+def record_query(query, params, seconds, df, nbytes=None, cache=None):
+    # Installed as a db_connections query hook. cache is 'hit' or 'miss' for
+    # queries run through the result cache (run_queries), None for direct calls
+    recorder.record(query.name, 'query', seconds, params=params, rows=len(df),
+                    nbytes=int(df.memory_usage(deep=True).sum()) if nbytes is None else nbytes, cache=cache)
+
@@ -0,0 +1,91 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from utils.db_connections import run_queries
+from utils.queries import leaderboard_queries
+from utils.store import get_store
+from utils.venue_cube import get_venue_cube
+
+logger = logging.getLogger(__name__)
+
+
+def _count(codes, mask, size):
+    return np.bincount(codes[mask], minlength=size)
+
+
+class Leaderboards:
+    # Batter, bowler and fielder leaderboards and venue totals, sliced out of
+    # the aggregate tables ingestion keeps current, or computed in one pass
+    # over the store when those tables cannot be trusted
+    def __init__(self, batting, bowling, fielding, venues):
+        self.batting = batting
+        self.bowling = bowling
+        self.fielding = fielding
+        self.venues = venues
+        self.totals = {
+            'total_runs': int(bowling['runs'].sum()),
+            'total_wickets': int(bowling['wickets'].sum()),
+            'total_catches': int(fielding['catches'].sum()),
+        }
+
+    @classmethod
+    def from_store(cls, store):
+        d = store.deliveries
+        players = d.labels('batter')
+        size = len(players)
+        batter, bowler, fielder = d['batter'], d['bowler'], d['fielder']
+        runs, extras = d['runs_batter'], d['runs_extras']
+        batted = batter >= 0
+        bowled = bowler >= 0
+
+        batting = pd.DataFrame({
+            'batter': players,
+            'runs': np.bincount(batter[batted], weights=runs[batted], minlength=size).astype(np.int64),
+            'fours': _count(batter, batted & (runs == 4), size),
+            'sixes': _count(batter, batted & (runs == 6), size),
+        })
+        bowling = pd.DataFrame({
+            'bowler': players,
+            'runs': np.bincount(bowler[bowled], weights=d['runs_total'][bowled], minlength=size).astype(np.int64),
+            'wickets': _count(bowler, bowled & d['wicket'], size),
+            'dots': _count(bowler, bowled & (runs == 0) & (extras == 0), size),
+        })
+        fielding = pd.DataFrame({
+            'fielder': players,
+            'catches': _count(fielder, d.equals('dismissal_kind', 'caught') & (fielder >= 0), size),
+        })
+        return cls(batting, bowling, fielding, get_venue_cube().venue_totals())
+
+    def top(self, table, metric, n=5):
+        df = getattr(self, table)
+        key = df.columns[0]
+        # Ties go to the first name alphabetically, whatever order the rows came in
+        df = df[df[metric] > 0].sort_values(key).nlargest(n, metric)
+        return df[[key, metric]].reset_index(drop=True)
+
+
+def _current(venues, store):
+    # Rows loaded into deliveries by anything but utils.ingest never reach the
+    # aggregate tables; the venue totals then disagree with the store on the
+    # number of deliveries, matches or runs
+    d = store.deliveries
+    known = d['venue'] >= 0
+    return (int(venues['balls'].sum()) == np.count_nonzero(known)
+            and int(venues['matches'].sum()) == len(np.unique(d['match_row'][known]))
+            and int(venues['total_runs'].sum()) == int(d['runs_total'][known].sum()))
+
+
+def get_leaderboards(version):
+    results = run_queries(leaderboard_queries, version)
+    store = get_store()
+    if _current(results['venues'], store):
+        return Leaderboards(results['batting'], results['bowling'], results['fielding'], results['venues'])
+    return store.derived('leaderboards', _from_store)
+
+
+def _from_store(store):
+    # Warned once per store, as the fallback is built once per store
+    logger.warning("Aggregate tables are behind the deliveries; computing the overview from the store. "
+                   "Run `python -m utils.aggregates rebuild` to bring them up to date.")
+    return Leaderboards.from_store(store)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from utils.plot_utils import plot_run_progression, plot_worm_chart, plot_phase_runs
+from utils.partnerships import get_partnerships
+from utils.result_cache import cached_result
+from utils.store import get_store
+
+DELIVERY_COLUMNS = ['match_id', 'inning', 'over_number', 'ball_number', 'batter', 'bowler', 'non_striker',
+                    'runs_batter', 'runs_extras', 'runs_total', 'wicket', 'dismissal_kind', 'fielder']
+
+
+class MatchAnalytics:
+    # All per-match aggregates are computed once up front; figures are only
+    # built the first time the tab that shows them is rendered
+    def __init__(self, deliveries, match_info, partnerships):
+        self.deliveries = deliveries
+        self.match_info = match_info
+        self.partnerships = partnerships
+        self._figures = {}
+
+        # One pass over the deliveries, grouped by batter, bowler and
+        # dismissal together; the bowling, batting and dismissal tables are
+        # rolled up from its few hundred groups
+        dismissed = deliveries['dismissal_kind'].notnull()
+        (batter, batters), (bowler, bowlers), (kind, kinds) = (
+            pd.factorize(deliveries[column]) for column in ('batter', 'bowler', 'dismissal_kind'))
+        keys = ((batter + 1) * (len(bowlers) + 1) + bowler + 1) * (len(kinds) + 1) + kind + 1
+        groups, inverse = np.unique(keys, return_inverse=True)
+        batter, rest = np.divmod(groups, (len(bowlers) + 1) * (len(kinds) + 1))
+        bowler, kind = np.divmod(rest, len(kinds) + 1)
+        batter, bowler, kind = batter - 1, bowler - 1, kind - 1
+        balls = np.bincount(inverse, minlength=len(groups))
+        sums = {column: np.bincount(inverse, weights=deliveries[column].to_numpy(), minlength=len(groups))
+                .astype(np.int64) for column in ('runs_batter', 'runs_total')}
+
+        def rollup(codes, labels, **columns):
+            known = codes >= 0
+            return {name: np.bincount(codes[known], weights=values[known], minlength=len(labels)).astype(np.int64)
+                    for name, values in columns.items()}
+
+        bowling = rollup(bowler, bowlers, runs=sums['runs_total'], balls=balls,
+                         wickets=np.where(kind >= 0, balls, 0))
+        self.bowling = pd.DataFrame(bowling, index=pd.Index(bowlers, name='bowler')).sort_index()
+        batting = rollup(batter, batters, runs_batter=sums['runs_batter'])
+        # Top scorers first, ties by name
+        self.batting = (pd.DataFrame({'batter': batters, 'runs_batter': batting['runs_batter']})
+                        .sort_values('batter', ignore_index=True)
+                        .sort_values('runs_batter', ascending=False, kind='stable'))
+        # Most frequent first, ties in order of first appearance
+        counts = rollup(kind, kinds, count=balls)['count']
+        order = np.argsort(-counts, kind='stable')
+        self.dismissals = pd.DataFrame({'dismissal_kind': kinds[order], 'count': counts[order]})
+
+        moments = deliveries[(deliveries['runs_batter'] >= 50) | dismissed]
+        self.moments = pd.DataFrame({
+            'over_number': moments['over_number'],
+            'inning': moments['inning'],
+            'desc': np.where(moments['runs_batter'] >= 50,
+                             moments['batter'] + " 50 Runs",
+                             moments['batter'].fillna('Unknown') + " Out (" + moments['dismissal_kind'].fillna('Unknown') + ")"),
+        })
+
+    def figure(self, name):
+        if name not in self._figures:
+            self._figures[name] = getattr(self, f"_{name}_figure")()
+        return self._figures[name]
+
+    def _run_progression_figure(self):
+        return plot_run_progression(self.deliveries)
+
+    def _phase_runs_figure(self):
+        return plot_phase_runs(self.deliveries)
+
+    def _worm_chart_figure(self):
+        return plot_worm_chart(self.deliveries)
+
+    def _partnership_figure(self):
+        partnership = self.partnerships.assign(
+            partnership=self.partnerships['batter_1'] + " & " + self.partnerships['batter_2'])
+        return px.bar(partnership, x='partnership', y='runs', color='inning',
+                      hover_data=['wicket', 'balls', 'batter_1_runs', 'batter_2_runs'],
+                      labels={'runs': 'Runs Scored', 'partnership': 'Partnership'})
+
+    def _economy_figure(self):
+        economy = (self.bowling['runs'] / self.bowling['balls']).reset_index(name='economy')
+        return px.imshow(economy.sort_values('economy').T, aspect="auto", text_auto=True,
+                         labels=dict(x="Bowler", y="Metric", color="Economy"))
+
+    def _dismissals_figure(self):
+        return px.pie(self.dismissals, names='dismissal_kind', values='count', title="Dismissal Types")
+
+    def _wickets_figure(self):
+        wickets = self.bowling.loc[self.bowling['wickets'] > 0, 'wickets'].reset_index()
+        return px.bar(wickets.sort_values('wickets', ascending=True),
+                      x='wickets', y='bowler', orientation='h', color='wickets')
+
+    def _moments_figure(self):
+        return px.scatter(self.moments, x='over_number', y='inning', text='desc',
+                          labels={'over_number': 'Over', 'inning': 'Inning'}, title="Key Moments Timeline")
+
+
+@cached_result
+def load_matches(version):
+    matches = get_store().matches
+    df = matches.frame(slice(None), ['match_id', 'season', 'match_date', 'team_1', 'team_2', 'winner'])
+    df['match_date'] = df['match_date'].dt.date
+    return df.sort_values('match_date', ascending=False).reset_index(drop=True)
+
+
+@st.cache_resource(max_entries=64)
+def get_match_analytics(match_id, version):
+    store = get_store()
+    deliveries = store.deliveries.frame(store.match_deliveries(match_id), DELIVERY_COLUMNS)
+    match_row = store.match_row(match_id)
+    match_info = store.matches.frame([match_row]).iloc[0]
+    return MatchAnalytics(deliveries, match_info, get_partnerships().for_match(match_row))
@@ -0,0 +1,301 @@
+import argparse
+import json
+import re
+import sys
+import time
+
+# Versioned schema changes, applied in order and recorded in
+# public.schema_migrations. Indexes follow the dashboard's access paths: the
+# partial ones cover the filtered leaderboards (wickets, dismissals, boundaries,
+# dot balls), the covering ones let the full-table aggregations run as
+# index-only scans instead of reading every deliveries row.
+MIGRATIONS = [
+    (1, "deliveries access paths", [
+        # Per-match order for the store load, and totals for the venue and season joins
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_match_ball
+           ON public.deliveries (match_id, inning, over_number, ball_number)
+           INCLUDE (batter, runs_batter, runs_extras, runs_total)""",
+        # Batting by phase and the runs leaderboard
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_batter_over
+           ON public.deliveries (batter, over_number) INCLUDE (runs_batter, match_id)""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_bowler
+           ON public.deliveries (bowler) INCLUDE (runs_batter, runs_extras, runs_total, match_id)""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_wickets
+           ON public.deliveries (bowler) INCLUDE (match_id) WHERE wicket = TRUE""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_dismissals
+           ON public.deliveries (dismissal_kind, fielder) INCLUDE (match_id) WHERE dismissal_kind IS NOT NULL""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_boundaries
+           ON public.deliveries (runs_batter, batter) WHERE runs_batter IN (4, 6)""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS deliveries_dot_balls
+           ON public.deliveries (bowler) WHERE runs_batter = 0 AND runs_extras = 0""",
+    ]),
+    (2, "matches access paths", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS matches_venue ON public.matches (venue, toss_decision)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS matches_team_1 ON public.matches (team_1)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS matches_team_2 ON public.matches (team_2)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS matches_winner ON public.matches (winner)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS matches_season ON public.matches (season)",
+    ]),
+    (3, "refresh planner statistics", [
+        "ANALYZE public.deliveries",
+        "ANALYZE public.matches",
+    ]),
+    # Frozen as written when it shipped: a later change to the aggregate
+    # definitions in utils.aggregates goes in a migration of its own
+    (4, "ingest manifest and aggregate tables", [
+        """CREATE TABLE IF NOT EXISTS public.ingest_manifest (
+               match_id bigint PRIMARY KEY,
+               digest text,
+               revision integer NOT NULL DEFAULT 0,
+               load_seq bigint NOT NULL,
+               loaded_at timestamptz NOT NULL DEFAULT now()
+           )""",
+        "CREATE SEQUENCE IF NOT EXISTS public.ingest_load_seq",
+        """CREATE TABLE IF NOT EXISTS public.agg_batting (
+               batter text NOT NULL, balls bigint NOT NULL, runs bigint NOT NULL,
+               fours bigint NOT NULL, sixes bigint NOT NULL, PRIMARY KEY (batter)
+           )""",
+        """CREATE TABLE IF NOT EXISTS public.agg_bowling (
+               bowler text NOT NULL, balls bigint NOT NULL, runs bigint NOT NULL,
+               wickets bigint NOT NULL, dots bigint NOT NULL, PRIMARY KEY (bowler)
+           )""",
+        """CREATE TABLE IF NOT EXISTS public.agg_fielding (
+               fielder text NOT NULL, catches bigint NOT NULL, PRIMARY KEY (fielder)
+           )""",
+        """CREATE TABLE IF NOT EXISTS public.agg_venue (
+               venue text NOT NULL, balls bigint NOT NULL, matches bigint NOT NULL,
+               runs bigint NOT NULL, wickets bigint NOT NULL, PRIMARY KEY (venue)
+           )""",
+        "TRUNCATE public.agg_batting, public.agg_bowling, public.agg_fielding, public.agg_venue",
+        """INSERT INTO public.agg_batting
+           SELECT d.batter, COUNT(*), SUM(d.runs_batter),
+                  COUNT(*) FILTER (WHERE d.runs_batter = 4), COUNT(*) FILTER (WHERE d.runs_batter = 6)
+           FROM public.deliveries d JOIN public.matches m ON m.match_id = d.match_id
+           WHERE d.batter IS NOT NULL
+           GROUP BY d.batter""",
+        """INSERT INTO public.agg_bowling
+           SELECT d.bowler, COUNT(*), SUM(d.runs_total), COUNT(*) FILTER (WHERE d.wicket),
+                  COUNT(*) FILTER (WHERE d.runs_batter = 0 AND d.runs_extras = 0)
+           FROM public.deliveries d JOIN public.matches m ON m.match_id = d.match_id
+           WHERE d.bowler IS NOT NULL
+           GROUP BY d.bowler""",
+        """INSERT INTO public.agg_fielding
+           SELECT d.fielder, COUNT(*)
+           FROM public.deliveries d JOIN public.matches m ON m.match_id = d.match_id
+           WHERE d.fielder IS NOT NULL AND d.dismissal_kind = 'caught'
+           GROUP BY d.fielder""",
+        """INSERT INTO public.agg_venue
+           SELECT m.venue, COUNT(*), COUNT(DISTINCT d.match_id), SUM(d.runs_total),
+                  COUNT(*) FILTER (WHERE d.dismissal_kind IS NOT NULL)
+           FROM public.deliveries d JOIN public.matches m ON m.match_id = d.match_id
+           WHERE m.venue IS NOT NULL
+           GROUP BY m.venue""",
+    ]),
+    # Matches loaded before this have no innings rows until they are
+    # re-ingested; the store falls back to the toss for those
+    (5, "innings batting teams", [
+        """CREATE TABLE IF NOT EXISTS public.innings (
+               match_id bigint NOT NULL,
+               inning smallint NOT NULL,
+               batting_team text,
+               PRIMARY KEY (match_id, inning)
+           )""",
+    ]),
+]
+
+# Placeholder values for EXPLAINing parameterised queries; with sequential
+# scans disabled the plan shape does not depend on them
+SAMPLE_VALUES = {str: '', int: 0, float: 0.0, bool: True}
+
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS public.schema_migrations (
+            version integer PRIMARY KEY,
+            name text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        )""")
+
+
+def applied(conn):
+    with conn.cursor() as cur:
+        _ensure_table(cur)
+        cur.execute("SELECT version FROM public.schema_migrations")
+        return {row[0] for row in cur.fetchall()}
+
+
+class PendingMigrations(Exception):
+    pass
+
+
+def pending(conn):
+    # Migrations not yet applied, read without creating the bookkeeping table
+    # so it also works for a read-only role
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+        done = set()
+        if cur.fetchone()[0]:
+            cur.execute("SELECT version FROM public.schema_migrations")
+            done = {row[0] for row in cur.fetchall()}
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in done]
+
+
+def require_current(conn):
+    # The app's queries read tables the migrations create (ingest_manifest),
+    # so it refuses to start against a database that is behind
+    missing = pending(conn)
+    if missing:
+        listed = ', '.join(f"{version} ({name})" for version, name in missing)
+        raise PendingMigrations(f"Database schema is out of date; pending migrations: {listed}. "
+                                f"Apply them with `python -m utils.migrations migrate` before starting the app.")
+
+
+CONCURRENT_INDEX = re.compile(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)", re.IGNORECASE)
+
+
+def _drop_if_invalid(cur, index):
+    # A CONCURRENTLY build that failed leaves the index behind marked
+    # invalid; IF NOT EXISTS would skip it, so it is dropped and rebuilt
+    cur.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = %s""", (index,))
+    row = cur.fetchone()
+    if row and row[0]:
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS public.{index}")
+
+
+def migrate(conn, target=None):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, so every
+    # statement commits on its own. A rerun after a failure repeats the
+    # migration: IF NOT EXISTS skips what was completed, and indexes whose
+    # concurrent build failed are dropped first so they are built again.
+    conn.autocommit = True
+    done = applied(conn)
+    ran = []
+    for version, name, statements in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            for statement in statements:
+                index = CONCURRENT_INDEX.search(statement)
+                if index:
+                    _drop_if_invalid(cur, index.group(1))
+                cur.execute(statement)
+            cur.execute("INSERT INTO public.schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        ran.append((version, name, time.perf_counter() - started))
+    return ran
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+# Registered queries that read every deliveries row by design: the store
+# load, and the per-season totals the overview charts. The check reports
+# their plans but does not fail on them.
+FULL_SCANS = {'store_deliveries', 'season_runs_wickets'}
+# A scan estimated to return at least this share of the table reads all of it
+# in effect, whatever access path the planner picked
+FULL_SCAN_FRACTION = 0.5
+SCAN_NODES = {'Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'}
+
+
+def _table_stats(cur, table):
+    # Estimated row count, and the partial indexes, whose full walk reads only
+    # the rows they cover
+    cur.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", (f"public.{table}",))
+    rows = cur.fetchone()[0]
+    if rows < 0:
+        # Never analyzed; the estimates would be guesses
+        cur.execute(f"ANALYZE public.{table}")
+        cur.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", (f"public.{table}",))
+        rows = cur.fetchone()[0]
+    cur.execute("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND i.indpred IS NOT NULL""", (f"public.{table}",))
+    return rows, {row[0] for row in cur.fetchall()}
+
+
+def _full_scan(node, rows, partial):
+    if node['Node Type'] == 'Seq Scan':
+        return True
+    if node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node \
+            and node.get('Index Name') not in partial:
+        return True
+    return rows > 0 and node.get('Plan Rows', 0) >= FULL_SCAN_FRACTION * rows
+
+
+def full_scans(conn, query, table='deliveries'):
+    # Scans that read the whole table: sequential ones, index walks with no
+    # condition, and any scan estimated to return most of the rows.
+    # Sequential scans are disabled while planning so the plan shape does not
+    # depend on the table being small; the planner then walks an index over
+    # every row instead, which the last two rules catch.
+    values = query.copy_params([SAMPLE_VALUES[kind] for kind in query.params.values()])
+    with conn.cursor() as cur:
+        rows, partial = _table_stats(cur, table)
+        cur.execute("SET enable_seqscan = off")
+        try:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {query.pyformat_sql()}", values)
+            plan = cur.fetchone()[0]
+        finally:
+            cur.execute("RESET enable_seqscan")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return [node for node in _plan_nodes(plan[0]['Plan'])
+            if node['Node Type'] in SCAN_NODES and node.get('Relation Name') == table
+            and _full_scan(node, rows, partial)]
+
+
+def check_plans(conn, queries=None):
+    from utils.queries import registry
+
+    conn.autocommit = True
+    failures, expected = {}, {}
+    for name, query in (queries or registry).items():
+        scans = full_scans(conn, query)
+        if scans:
+            (expected if name in FULL_SCANS else failures)[name] = scans
+    return failures, expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations and check query plans")
+    parser.add_argument("command", choices=["migrate", "status", "check"])
+    parser.add_argument("--dsn", help="database to use instead of the app's configured one")
+    parser.add_argument("--target", type=int, help="migrate up to this version only")
+    args = parser.parse_args(argv)
+
+    from utils.db_connections import connect
+
+    conn = connect(args.dsn)
+    try:
+        if args.command == "migrate":
+            for version, name, seconds in migrate(conn, args.target):
+                print(f"Applied {version}: {name} ({seconds:.1f}s)")
+            return 0
+        if args.command == "status":
+            done = applied(conn)
+            for version, name, _ in MIGRATIONS:
+                print(f"{'applied' if version in done else 'pending'}  {version}: {name}")
+            return 0
+        failures, expected = check_plans(conn)
+        for name, scans in expected.items():
+            print(f"ok   {name}: reads all of deliveries by design ({scans[0]['Node Type']})")
+        for name, scans in failures.items():
+            print(f"FAIL {name}: {scans[0]['Node Type']} over all of deliveries "
+                  f"(estimated {scans[0].get('Plan Rows', '?')} rows)", file=sys.stderr)
+        print(f"{len(failures)} of the registered queries read all of deliveries")
+        return 1 if failures else 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # python -m utils.migrations migrate|status|check [--dsn ...]
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from utils.filters import get_filter_index
+from utils.store import get_store
+
+
+class Partnerships:
+    # Every partnership of every match, from one pass over the ordered
+    # deliveries: a partnership starts at the first ball of an innings, after
+    # each wicket and whenever the pair at the crease changes (retirements),
+    # whoever is on strike. Stored as one row per partnership in match order.
+    def __init__(self, store):
+        d, m = store.deliveries, store.matches
+        self.deliveries, self.matches = d, m
+        batter, non_striker = d['batter'], d['non_striker']
+        first, second = np.minimum(batter, non_striker), np.maximum(batter, non_striker)
+        wicket = d['wicket']
+        new_innings = np.r_[True, (np.diff(d['match_row']) != 0) | (np.diff(d['inning']) != 0)]
+        starts = np.flatnonzero(new_innings | np.r_[False, wicket[:-1]]
+                                | np.r_[True, (np.diff(first) != 0) | (np.diff(second) != 0)])
+        ends = np.r_[starts[1:], len(d)] - 1
+
+        # Wickets fallen in the innings before each partnership began
+        fell = np.cumsum(wicket) - wicket
+        innings_start = np.flatnonzero(new_innings)
+        fell -= np.repeat(fell[innings_start], np.diff(np.r_[innings_start, len(d)]))
+
+        runs_batter = d['runs_batter'].astype(np.int64)
+        self.match_row = d['match_row'][starts]
+        self.inning = d['inning'][starts]
+        self.wicket = (fell[starts] + 1).astype(np.int8)
+        self.batter_1, self.batter_2 = first[starts], second[starts]
+        self.runs = np.add.reduceat(d['runs_total'].astype(np.int64), starts).astype(np.int32)
+        self.balls = np.diff(np.r_[starts, len(d)]).astype(np.int32)
+        self.batter_1_runs = np.add.reduceat(np.where(batter == first, runs_batter, 0), starts).astype(np.int32)
+        self.batter_2_runs = np.add.reduceat(np.where(batter == second, runs_batter, 0), starts).astype(np.int32)
+        self.unbeaten = ~wicket[ends]
+        self.starts = starts
+        # The partnership's side, for team records
+        self.team = get_filter_index().teams['batting'][starts]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def frame(self, rows):
+        d = self.deliveries
+        return pd.DataFrame({
+            'match_id': self.matches['match_id'][self.match_row[rows]],
+            'season': self.matches.decode('season', self.matches['season'][self.match_row[rows]]),
+            'inning': self.inning[rows],
+            'wicket': self.wicket[rows],
+            'batter_1': d.decode('batter', self.batter_1[rows]),
+            'batter_2': d.decode('batter', self.batter_2[rows]),
+            'runs': self.runs[rows],
+            'balls': self.balls[rows],
+            'batter_1_runs': self.batter_1_runs[rows],
+            'batter_2_runs': self.batter_2_runs[rows],
+            'unbeaten': self.unbeaten[rows],
+        })
+
+    def for_match(self, match_row):
+        lo, hi = np.searchsorted(self.match_row, [match_row, match_row + 1])
+        return self.frame(np.arange(lo, hi))
+
+    def _top(self, rows, n):
+        order = np.lexsort((rows, -self.runs[rows]))[:n]
+        return self.frame(rows[order]).reset_index(drop=True)
+
+    def for_player(self, player_name, n=5):
+        code = self.deliveries.code('batter', player_name)
+        rows = np.flatnonzero((self.batter_1 == code) | (self.batter_2 == code)) if code >= 0 else np.empty(0, np.int64)
+        return self._top(rows, n)
+
+    def for_team(self, team_name, n=5):
+        code = self.matches.code('team_1', team_name)
+        rows = np.flatnonzero(self.team == code) if code >= 0 else np.empty(0, np.int64)
+        return self._top(rows, n)
+
+    def records_by_wicket(self, team_name=None):
+        # The highest partnership for each wicket, overall or for one side
+        rows = np.arange(len(self))
+        if team_name is not None:
+            code = self.matches.code('team_1', team_name)
+            rows = rows[self.team == code] if code >= 0 else rows[:0]
+        rows = rows[np.lexsort((rows, -self.runs[rows], self.wicket[rows]))]
+        best = rows[np.r_[True, np.diff(self.wicket[rows]) != 0]] if len(rows) else rows
+        return self.frame(best).reset_index(drop=True)
+
+
+def get_partnerships():
+    return get_store().derived('partnerships', Partnerships)
@@ -0,0 +1,31 @@
+import numpy as np
+from utils.store import get_store
+
+ROLES = {'batting': 'batter', 'bowling': 'bowler', 'fielding': 'fielder'}
+
+
+class PlayerIndex:
+    # Inverted index from player code to the sorted delivery row offsets where
+    # the player batted, bowled or fielded, laid out CSR-style per role
+    def __init__(self, store):
+        self.deliveries = store.deliveries
+        size = len(self.deliveries.labels('batter'))
+        self.offsets = {}
+        self.rows_by_role = {}
+        for role, column in ROLES.items():
+            codes = self.deliveries[column]
+            valid = np.flatnonzero(codes >= 0)
+            self.rows_by_role[role] = valid[np.argsort(codes[valid], kind='stable')]
+            counts = np.bincount(codes[valid], minlength=size)
+            self.offsets[role] = np.concatenate([[0], np.cumsum(counts)])
+
+    def rows(self, player_name, role):
+        code = self.deliveries.code(ROLES[role], player_name)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = self.offsets[role]
+        return self.rows_by_role[role][offsets[code]:offsets[code + 1]]
+
+
+def get_player_index():
+    return get_store().derived('player_index', PlayerIndex)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from utils.result_cache import cached_result
+from utils.store import get_store
+from utils.player_index import get_player_index
+from utils.head_to_head import get_head_to_head
+from utils.filters import get_filter_index
+from utils.partnerships import get_partnerships
+
+# Player page filters: the role picks which of the player's deliveries count,
+# the match type keeps those where the player's side is at its own home venue
+# or at its opponent's; neutral venues count only under All
+ROLES = {'Batter': ['batting'], 'Bowler': ['bowling'], 'All-Rounder': ['batting', 'bowling']}
+MATCH_TYPES = {'All': None, 'Home': True, 'Away': False}
+
+
+def _player_rows(player_name, role='All-Rounder', match_type='All'):
+    index, filters = get_player_index(), get_filter_index()
+    home = MATCH_TYPES[match_type]
+    parts = [filters.select(index.rows(player_name, side), side=side, home=home) for side in ROLES[role]]
+    return parts[0] if len(parts) == 1 else np.union1d(*parts)
+
+
+def _matchups(rows, opponent, n, min_balls, sort):
+    # Head-to-head over a filtered subset of rows, which the precomputed
+    # matrix (built over every delivery) cannot answer
+    deliveries = get_store().deliveries
+    df = deliveries.aggregate(rows, opponent, runs=('runs_batter', 'sum'), balls=('runs_batter', 'count'))
+    dismissed = rows[deliveries['wicket'][rows] & ~deliveries.equals('dismissal_kind', 'run out')[rows]]
+    dismissals = deliveries.aggregate(dismissed, opponent, dismissals=('wicket', 'count'))
+    df = df.merge(dismissals, on=opponent, how='left').fillna({'dismissals': 0})
+    df['dismissals'] = df['dismissals'].astype(np.int64)
+    df = df[df['balls'] >= min_balls]
+    return df.nlargest(n, sort).reset_index(drop=True)
+
+
+@cached_result
+def load_players(version):
+    return get_store().player_names
+
+
+@cached_result
+def runs_per_over_phase(player_name, version, match_type='All'):
+    deliveries = get_store().deliveries
+    rows = _player_rows(player_name, 'Batter', match_type)
+    return deliveries.aggregate(rows, 'phase', runs=('runs_batter', 'sum'))
+
+
+@cached_result
+def season_wise_performance(player_name, version, role='All-Rounder', match_type='All'):
+    deliveries = get_store().deliveries
+    rows = _player_rows(player_name, role, match_type)
+    return deliveries.aggregate(rows, 'season', runs=('runs_batter', 'sum'), wickets=('wicket', 'sum'))
+
+
+@cached_result
+def dismissal_types(player_name, version, match_type='All'):
+    deliveries = get_store().deliveries
+    rows = _player_rows(player_name, 'Batter', match_type)
+    rows = rows[deliveries['dismissal_kind'][rows] >= 0]
+    return deliveries.aggregate(rows, 'dismissal_kind', count=('dismissal_kind', 'count'))
+
+
+@cached_result
+def boundary_analysis(player_name, version, match_type='All'):
+    deliveries = get_store().deliveries
+    runs = deliveries['runs_batter'][_player_rows(player_name, 'Batter', match_type)]
+    return pd.Series({'fours': np.count_nonzero(runs == 4), 'sixes': np.count_nonzero(runs == 6)})
+
+
+@cached_result
+def strike_rate_by_phase(player_name, version, match_type='All'):
+    deliveries = get_store().deliveries
+    rows = _player_rows(player_name, 'Batter', match_type)
+    df = deliveries.aggregate(rows, 'phase', runs=('runs_batter', 'sum'), balls=('runs_batter', 'count'))
+    df['strike_rate'] = (df['runs'] * 100.0 / df['balls']).round(2)
+    return df[['phase', 'strike_rate']]
+
+
+@cached_result
+def player_top_venues(player_name, version, role='All-Rounder', match_type='All'):
+    deliveries = get_store().deliveries
+    rows = _player_rows(player_name, role, match_type)
+    df = deliveries.aggregate(rows, 'venue', matches=('match_id', 'nunique'))
+    return df.nlargest(5, 'matches').reset_index(drop=True)
+
+
+@cached_result
+def player_vs_bowler(player_name, version, min_balls=0, match_type='All'):
+    if match_type == 'All':
+        df = get_head_to_head().vs_bowlers(player_name, n=5, min_balls=min_balls)
+    else:
+        df = _matchups(_player_rows(player_name, 'Batter', match_type), 'bowler', 5, min_balls, 'runs')
+    return df[['bowler', 'runs', 'balls']].rename(columns={'balls': 'balls_faced'})
+
+
+@cached_result
+def bowler_vs_batter(player_name, version, min_balls=0, match_type='All'):
+    if match_type == 'All':
+        df = get_head_to_head().vs_batters(player_name, n=5, min_balls=min_balls, sort='dismissals')
+    else:
+        df = _matchups(_player_rows(player_name, 'Bowler', match_type), 'batter', 5, min_balls, 'dismissals')
+    return df[['batter', 'dismissals', 'balls', 'runs']]
+
+
+@cached_result
+def top_partnerships(player_name, version):
+    return get_partnerships().for_player(player_name)
+
+
+# Per-entity loaders, in page order; each takes (name, version) and defaults
+# to the unfiltered view
+loaders = [
+    runs_per_over_phase,
+    season_wise_performance,
+    dismissal_types,
+    boundary_analysis,
+    strike_rate_by_phase,
+    player_top_venues,
+    player_vs_bowler,
+    bowler_vs_batter,
+    top_partnerships,
+]
@@ -1,31 +1,56 @@
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
 
+PHASES = np.array(['Powerplay', 'Middle Overs', 'Death Overs'])
+# Last over of every phase but the final one: 1-6 Powerplay, 7-15 Middle, 16+ Death
+PHASE_LAST_OVERS = np.array([6, 15])
+
+
+def phase_codes(over_number):
+    return np.searchsorted(PHASE_LAST_OVERS, np.asarray(over_number), side='left').astype(np.int8)
+
+
+def assign_phase(over_number):
+    return PHASES[phase_codes(over_number)]
+
 
 def plot_run_progression(df):
-    df['cumsum_runs'] = df.groupby('inning')['runs_total'].cumsum()
-    fig = px.line(df, x=df.index, y='cumsum_runs', color='inning', markers=True, title="Run Progression")
+    cumsum_runs = df.groupby('inning')['runs_total'].cumsum()
+    fig = px.line(x=df.index, y=cumsum_runs, color=df['inning'], markers=True, title="Run Progression",
+                  labels={'x': 'index', 'y': 'cumsum_runs', 'color': 'inning'})
     return fig
 
 
 def plot_phase_runs(df):
-    def assign_phase(over):
-        if over <= 6:
-            return 'Powerplay'
-        elif over <= 15:
-            return 'Middle Overs'
-        else:
-            return 'Death Overs'
-
-    df['phase'] = df['over_number'].apply(assign_phase)
-    runs_phase = df.groupby(['inning', 'phase'])['runs_total'].sum().reset_index()
+    phase = pd.Series(assign_phase(df['over_number']), index=df.index, name='phase')
+    runs_phase = df['runs_total'].groupby([df['inning'], phase]).sum().reset_index()
 
     fig = px.bar(runs_phase, x='phase', y='runs_total', color='inning', barmode='group', title="Runs by Over Phases")
     return fig
 
 
 def plot_worm_chart(df):
-    df['cumsum_runs'] = df.groupby('inning')['runs_total'].cumsum()
-    df['ball_no'] = df.groupby('inning').cumcount() + 1
-    fig = px.line(df, x='ball_no', y='cumsum_runs', color='inning', markers=True, title="Worm Chart (Runs vs Balls)")
+    cumsum_runs = df.groupby('inning')['runs_total'].cumsum()
+    ball_no = df.groupby('inning').cumcount() + 1
+    fig = px.line(x=ball_no, y=cumsum_runs, color=df['inning'], markers=True, title="Worm Chart (Runs vs Balls)",
+                  labels={'x': 'ball_no', 'y': 'cumsum_runs', 'color': 'inning'})
     return fig
+
+
+def overlay_win_probability(fig, curve):
+    # Worm chart with the side batting first's win probability, after every
+    # ball of each innings, on a second axis
+    overlay = make_subplots(specs=[[{"secondary_y": True}]])
+    overlay.add_traces(fig.data)
+    overlay.update_layout(fig.layout)
+    team = curve['batting_first'].iloc[0] if len(curve) else None
+    for inning, balls in curve.groupby('inning'):
+        overlay.add_trace(go.Scatter(x=balls['ball_no'], y=balls['win_probability'] * 100, mode='lines',
+                                     line=dict(dash='dot'), name=f"{team} win % (inning {inning})"),
+                          secondary_y=True)
+    overlay.update_yaxes(title_text="cumsum_runs", secondary_y=False)
+    overlay.update_yaxes(title_text=f"{team} win %", range=[0, 100], secondary_y=True)
+    return overlay
@@ -1,60 +1,72 @@
-total_matches_query = """
+import re
+
+import pandas as pd
+
+PG_TYPES = {str: 'text', int: 'bigint', float: 'double precision', bool: 'boolean'}
+
+registry = {}
+
+# Postgres CSV writes booleans as t/f
+CSV_BOOLEANS = {'true_values': ['t'], 'false_values': ['f']}
+
+
+class Query:
+    # A named statement with typed parameters. The SQL uses $1, $2, ... in
+    # declaration order so it can be PREPAREd once per pooled connection.
+    # schema optionally declares result column dtypes for bulk COPY reads.
+    def __init__(self, name, sql, schema=None, **params):
+        self.name = name
+        self.sql = sql.strip().rstrip(';')
+        self.schema = schema or {}
+        self.params = params
+        registry[name] = self
+
+    def bind(self, **values):
+        missing = self.params.keys() - values.keys()
+        unknown = values.keys() - self.params.keys()
+        if missing or unknown:
+            raise TypeError(f"{self.name} expects parameters {list(self.params)}, got {list(values)}")
+        bound = []
+        for name, kind in self.params.items():
+            value = values[name]
+            if kind is str and not isinstance(value, str):
+                raise TypeError(f"{self.name}: parameter {name} must be str, got {type(value).__name__}")
+            bound.append(kind(value))
+        return tuple(bound)
+
+    def prepare_sql(self):
+        types = ', '.join(PG_TYPES[kind] for kind in self.params.values())
+        signature = f" ({types})" if self.params else ""
+        return f"PREPARE {self.name}{signature} AS {self.sql}"
+
+    def pyformat_sql(self):
+        # $n as a pyformat placeholder, for statements that cannot take bind
+        # parameters (COPY, EXPLAIN) and are quoted client-side by mogrify
+        return re.sub(r'\$(\d+)', lambda m: f"%(p{m.group(1)})s", self.sql.replace('%', '%%'))
+
+    def copy_sql(self):
+        return f"COPY ({self.pyformat_sql()}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+    def copy_params(self, values):
+        return {f"p{i}": value for i, value in enumerate(values, start=1)}
+
+    def read_csv(self, buffer):
+        dtypes = {column: kind for column, kind in self.schema.items() if kind != 'date'}
+        dates = [column for column, kind in self.schema.items() if kind == 'date']
+        return pd.read_csv(buffer, dtype=dtypes, parse_dates=dates, **CSV_BOOLEANS)
+
+    def execute_sql(self):
+        if not self.params:
+            return f"EXECUTE {self.name}"
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * len(self.params))})"
+
+
+total_matches_query = Query("total_matches", """
 SELECT COUNT(*) AS total_matches FROM public.matches;
-"""
+""")
 
-total_runs_query = """
-SELECT SUM(runs_total) AS total_runs FROM public.deliveries;
-"""
-
-total_wickets_query = """
-SELECT COUNT(*) AS total_wickets FROM public.deliveries WHERE wicket = TRUE;
-"""
-
-top_batter_query = """
-SELECT batter AS Batter, SUM(runs_batter) AS Runs 
-FROM public.deliveries 
-GROUP BY batter 
-ORDER BY Runs DESC 
-LIMIT 5;
-"""
-
-top_bowler_query = """
-SELECT bowler AS Bowler, COUNT(*) AS Wickets 
-FROM public.deliveries 
-WHERE wicket = TRUE
-GROUP BY bowler 
-ORDER BY Wickets DESC 
-LIMIT 5;
-"""
-
-top_six_hitter_query = """
-SELECT batter AS Batter, COUNT(*) AS Sixes
-FROM public.deliveries 
-WHERE runs_batter = 6
-GROUP BY batter
-ORDER BY Sixes DESC
-LIMIT 5;
-"""
-top_four_hitter_query = """
-SELECT batter AS Batter, COUNT(*) AS Fours
-FROM public.deliveries 
-WHERE runs_batter = 4
-GROUP BY batter
-ORDER BY Fours DESC
-LIMIT 5;
-"""
-
-most_dot_balls_query = """
-SELECT bowler AS Bowler, COUNT(*) AS Dots
-FROM public.deliveries 
-WHERE runs_batter = 0 
-AND runs_extras = 0
-GROUP BY bowler
-ORDER BY Dots DESC
-LIMIT 5;
-"""
-
-season_runs_wickets_query = """SELECT 
+season_runs_wickets_query = Query("season_runs_wickets", """
+SELECT 
     season, 
     SUM(runs_batter + runs_extras ) AS total_runs,
     COUNT(deliveries.batter) AS total_wickets
@@ -62,69 +74,96 @@ FROM public.deliveries
 JOIN  public.matches ON deliveries.match_id = matches.match_id
 GROUP BY season
 ORDER BY season;
-"""
+""")
 
-toss_winner_query = """
+toss_winner_query = Query("toss_winner", """
 SELECT
     team_1 as team,
     COUNT(*) AS toss_won,
     SUM(CASE WHEN toss_winner = winner THEN 1 ELSE 0 END) AS matches_won_after_toss
 FROM public.matches
 GROUP BY team_1;
-"""
-
-dismissal_types_query = """
-SELECT COUNT(*) AS total_catches
-FROM public.deliveries
-WHERE dismissal_kind = 'caught';
-"""
+""")
 
-caught_fielders_query = """
-SELECT fielder,COUNT(*) AS catches
-FROM public.deliveries
-WHERE dismissal_kind = 'caught' AND fielder IS NOT NULL
-GROUP BY fielder
-ORDER BY catches DESC
-LIMIT 5;
-"""
-
-player_of_the_match_query = """
+player_of_the_match_query = Query("player_of_the_match", """
 SELECT player_of_match, COUNT(*) AS awards
 FROM public.matches
 GROUP BY player_of_match
 ORDER BY awards DESC
 LIMIT 5;
-"""
-
-
-highest_scoring_venue_query = """
-SELECT venue, SUM(runs_total) AS total_runs
-FROM public.deliveries d
-JOIN matches m ON d.match_id = m.match_id
-GROUP BY venue;
-"""
-
-venue_wickets_query = """
-SELECT venue, COUNT(*) AS total_wickets
-FROM public.deliveries d
-JOIN matches m ON d.match_id = m.match_id
-WHERE dismissal_kind IS NOT NULL
-GROUP BY venue;
-"""
-
-venue_toss_query = """
-SELECT venue, toss_decision AS decision, COUNT(*) AS count
+""")
+
+players_query = Query("players", """
+SELECT DISTINCT player_name FROM public.players ORDER BY player_name
+""")
+
+teams_query = Query("teams", """
+SELECT DISTINCT team_name FROM public.teams ORDER BY team_name
+""")
+
+data_version_query = Query("data_version", """
+SELECT COALESCE(MAX(match_id), 0) AS max_match_id, COUNT(*) AS matches,
+       (SELECT COALESCE(MAX(load_seq), 0) FROM public.ingest_manifest) AS load_seq
 FROM public.matches
-GROUP BY venue, toss_decision;
-"""
-
-venue_runs_query = """
-SELECT venue, ROUND(AVG(total_runs)/2,2) AS avg_score
-FROM (
-    SELECT m.match_id, venue, SUM(runs_total) AS total_runs
-    FROM public.deliveries d
-    JOIN public.matches m ON d.match_id = m.match_id
-    GROUP BY m.match_id, venue
-) sub
-GROUP BY venue;
-"""
\ No newline at end of file
+""")
+
+store_deliveries_query = Query("store_deliveries", """
+SELECT match_id, inning, over_number, ball_number, batter, bowler, non_striker,
+       runs_batter, runs_extras, runs_total, wicket, dismissal_kind, fielder
+FROM public.deliveries
+ORDER BY match_id, inning, over_number, ball_number
+""", schema={
+    'match_id': 'int64', 'inning': 'int8', 'over_number': 'int16', 'ball_number': 'int16',
+    'batter': 'object', 'bowler': 'object', 'non_striker': 'object',
+    'runs_batter': 'int16', 'runs_extras': 'int16', 'runs_total': 'int16',
+    'wicket': 'boolean', 'dismissal_kind': 'object', 'fielder': 'object',
+})
+
+store_matches_query = Query("store_matches", """
+SELECT m.match_id, season, match_date, city, venue, team_1, team_2,
+       toss_winner, toss_decision, winner, player_of_match, COALESCE(i.revision, 0) AS revision
+FROM public.matches m
+LEFT JOIN public.ingest_manifest i ON i.match_id = m.match_id
+ORDER BY m.match_id
+""", schema={
+    'match_id': 'int64', 'season': 'object', 'match_date': 'date', 'city': 'object',
+    'venue': 'object', 'team_1': 'object', 'team_2': 'object', 'toss_winner': 'object',
+    'toss_decision': 'object', 'winner': 'object', 'player_of_match': 'object', 'revision': 'int32',
+})
+
+store_innings_query = Query("store_innings", """
+SELECT match_id, inning, batting_team FROM public.innings ORDER BY match_id, inning
+""", schema={'match_id': 'int64', 'inning': 'int8', 'batting_team': 'object'})
+
+# Reads of the aggregate tables ingestion maintains (utils.aggregates)
+leaderboard_batting_query = Query("leaderboard_batting", """
+SELECT batter, runs, fours, sixes FROM public.agg_batting
+""")
+
+leaderboard_bowling_query = Query("leaderboard_bowling", """
+SELECT bowler, runs, wickets, dots FROM public.agg_bowling
+""")
+
+leaderboard_fielding_query = Query("leaderboard_fielding", """
+SELECT fielder, catches FROM public.agg_fielding
+""")
+
+venue_totals_query = Query("venue_totals", """
+SELECT venue, runs AS total_runs, wickets AS total_wickets,
+       ROUND(runs::numeric / matches / 2, 2) AS avg_score, balls, matches
+FROM public.agg_venue
+""")
+
+overview_queries = {
+    'total_matches': total_matches_query,
+    'season_runs_wickets': season_runs_wickets_query,
+    'toss_winner': toss_winner_query,
+    'player_of_the_match': player_of_the_match_query,
+}
+
+leaderboard_queries = {
+    'batting': leaderboard_batting_query,
+    'bowling': leaderboard_bowling_query,
+    'fielding': leaderboard_fielding_query,
+    'venues': venue_totals_query,
+}
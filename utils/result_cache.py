@@ -0,0 +1,290 @@
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+from utils.instrumentation import recorder
+
+# Result cache shared by every replica on a host: loader results are pickled
+# into one SQLite file (WAL mode, so readers do not block each other), keyed by
+# loader name and arguments, which carry the data or entity version. Total
+# size is held under a byte budget by evicting the least recently used entries.
+CACHE_PATH = os.environ.get("IPL_RESULT_CACHE_PATH", "result_cache.sqlite3")
+CACHE_BUDGET_BYTES = int(os.environ.get("IPL_RESULT_CACHE_BYTES", 512 * 1024 * 1024))
+# Seconds a replica waits for another one's write before giving up on the cache
+BUSY_TIMEOUT_SECONDS = 5
+# Hits are plain reads; their last-used times and the hit and miss counts
+# are kept in memory and written back at most this often
+FLUSH_SECONDS = float(os.environ.get("IPL_RESULT_CACHE_FLUSH_SECONDS", 5))
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+           key TEXT PRIMARY KEY,
+           name TEXT NOT NULL,
+           value BLOB NOT NULL,
+           nbytes INTEGER NOT NULL,
+           last_used REAL NOT NULL
+       )""",
+    "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)",
+    "CREATE INDEX IF NOT EXISTS entries_name ON entries (name)",
+    """CREATE TABLE IF NOT EXISTS counters (
+           name TEXT PRIMARY KEY,
+           hits INTEGER NOT NULL DEFAULT 0,
+           misses INTEGER NOT NULL DEFAULT 0,
+           evictions INTEGER NOT NULL DEFAULT 0
+       )""",
+]
+
+_MISSING = object()
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_PATH, budget_bytes=CACHE_BUDGET_BYTES):
+        self.path = path
+        self.budget_bytes = budget_bytes
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._touched = {}
+        self._counts = Counter()
+        self._flushed_at = time.monotonic()
+        with self._transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        # sqlite3 connections stay on the thread (and process) that opened them
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _transaction(self):
+        conn = self._connection()
+
+        class Transaction:
+            def __enter__(self):
+                conn.execute("BEGIN IMMEDIATE")
+                return conn
+
+            def __exit__(self, kind, exc, tb):
+                conn.execute("COMMIT" if kind is None else "ROLLBACK")
+
+        return Transaction()
+
+    def _count(self, conn, name, column, n=1):
+        conn.execute(f"INSERT INTO counters (name, {column}) VALUES (?, ?) "
+                     f"ON CONFLICT (name) DO UPDATE SET {column} = {column} + excluded.{column}", (name, n))
+
+    def _note(self, key, name, column):
+        with self._pending_lock:
+            if key is not None:
+                self._touched[key] = time.time()
+            self._counts[(name, column)] += 1
+            due = time.monotonic() - self._flushed_at >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def _write_pending(self, conn):
+        with self._pending_lock:
+            touched, counts = self._touched, self._counts
+            self._touched, self._counts = {}, Counter()
+            self._flushed_at = time.monotonic()
+        conn.executemany("UPDATE entries SET last_used = MAX(last_used, ?) WHERE key = ?",
+                         [(used, key) for key, used in touched.items()])
+        for (name, column), n in counts.items():
+            self._count(conn, name, column, n)
+
+    def flush(self):
+        # Write buffered last-used times and counts; they only steer eviction
+        # and the diagnostics, so a failed write drops them
+        try:
+            with self._transaction() as conn:
+                self._write_pending(conn)
+        except sqlite3.Error as exc:
+            logger.warning("Could not flush result cache counters: %s", exc)
+
+    def get(self, key, name):
+        # The cached value, or _MISSING; either way the lookup is counted.
+        # A plain read, so hits never wait on the write lock.
+        row = self._connection().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            try:
+                value = pickle.loads(row[0])
+            except Exception as exc:
+                # Written by an incompatible version of a class, or truncated
+                logger.warning("Dropping unreadable result cache entry %s: %s", key, exc)
+                with self._transaction() as conn:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            else:
+                self._note(key, name, 'hits')
+                return value
+        self._note(None, name, 'misses')
+        return _MISSING
+
+    def put(self, key, name, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.budget_bytes:
+            return False
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, name, value, nbytes, last_used) VALUES (?, ?, ?, ?, ?)",
+                         (key, name, blob, len(blob), time.time()))
+            self._write_pending(conn)
+            self._evict(conn)
+        return True
+
+    def _evict(self, conn):
+        # Drop least recently used entries until the total fits the budget
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        while total > self.budget_bytes:
+            victims = conn.execute("SELECT key, name, nbytes FROM entries ORDER BY last_used LIMIT 64").fetchall()
+            for key, name, nbytes in victims:
+                if total <= self.budget_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count(conn, name, 'evictions')
+                total -= nbytes
+
+    def clear(self, name=None):
+        with self._transaction() as conn:
+            if name is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+
+    def stats(self):
+        self.flush()
+        conn = self._connection()
+        entries, nbytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM entries").fetchone()
+        hits, misses, evictions = conn.execute(
+            "SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0), COALESCE(SUM(evictions), 0) FROM counters"
+        ).fetchone()
+        return {
+            'path': self.path,
+            'entries': entries,
+            'bytes': nbytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+
+    def counters(self):
+        # Per-loader counts, summed over every replica sharing the file
+        self.flush()
+        conn = self._connection()
+        df = pd.read_sql("SELECT c.name, c.hits, c.misses, c.evictions, "
+                         "COUNT(e.key) AS entries, COALESCE(SUM(e.nbytes), 0) AS bytes "
+                         "FROM counters c LEFT JOIN entries e ON e.name = c.name "
+                         "GROUP BY c.name ORDER BY c.name", conn)
+        df['hit_ratio'] = (df['hits'] / (df['hits'] + df['misses'])).round(3)
+        return df
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def _normalize(value, hash_funcs):
+    for kind, func in hash_funcs.items():
+        if isinstance(value, kind):
+            return _normalize(func(value), hash_funcs)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _normalize(item, hash_funcs)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item, hash_funcs) for item in value)
+    if hasattr(value, 'item'):
+        # numpy scalars key the same as the Python values they hold
+        return value.item()
+    return value
+
+
+def bind_arguments(signature, args, kwargs):
+    # Arguments by name with defaults filled in, so f(a, v) and
+    # f(a, v, 'All') or f(a, version=v) share a key
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def source_hash(fn):
+    # Keys change with the function's code, so a deploy that changes a
+    # loader does not keep serving what the old one cached in the shared file
+    try:
+        source = inspect.getsource(fn).encode()
+    except (OSError, TypeError):
+        source = fn.__code__.co_code
+    return hashlib.sha1(source).hexdigest()[:12]
+
+
+def cache_key(name, arguments, hash_funcs=None, source=''):
+    normalized = _normalize(arguments, hash_funcs or {})
+    return f"{name}:{hashlib.sha1(repr((source, normalized)).encode()).hexdigest()}"
+
+
+def cached_result(fn=None, hash_funcs=None, on_hit=None):
+    # Serve fn's results from the shared cache, and record each call with its
+    # hit or miss in the instrumentation ring buffer. Cache errors (a locked
+    # or unwritable file) fall back to calling fn directly. on_hit(arguments,
+    # result, seconds) runs after each hit, for work fn would have recorded.
+    if fn is None:
+        return functools.partial(cached_result, hash_funcs=hash_funcs, on_hit=on_hit)
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    signature = inspect.signature(fn)
+    source = source_hash(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        arguments = bind_arguments(signature, args, kwargs)
+        key = cache_key(name, arguments, hash_funcs, source)
+        try:
+            cache = get_result_cache()
+            result = cache.get(key, name)
+        except sqlite3.Error as exc:
+            logger.warning("Result cache unavailable: %s", exc)
+            cache, result = None, _MISSING
+        hit = result is not _MISSING
+        if not hit:
+            result = fn(*args, **kwargs)
+            if cache is not None:
+                try:
+                    cache.put(key, name, result)
+                except sqlite3.Error as exc:
+                    logger.warning("Could not store %s in the result cache: %s", name, exc)
+        seconds = time.perf_counter() - started
+        if hit and on_hit is not None:
+            on_hit(arguments, result, seconds)
+        rows = len(result) if hasattr(result, '__len__') else None
+        recorder.record(fn.__name__, 'loader', seconds, params=arguments, rows=rows, cache='hit' if hit else 'miss')
+        return result
+
+    def prime(result, *args, **kwargs):
+        # Store a result computed elsewhere (a batch job) under the key a call
+        # with these arguments would look up
+        key = cache_key(name, bind_arguments(signature, args, kwargs), hash_funcs, source)
+        get_result_cache().put(key, name, result)
+
+    wrapper.clear = lambda: get_result_cache().clear(name)
+    wrapper.prime = prime
+    return wrapper
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from utils.store import ColumnStore, Table
+
+# A snapshot is a directory of plain .npy files, one per column and one per
+# vocabulary, plus manifest.json. Every array is memory-mapped on load, so
+# replicas on one host share the page cache and start without a database.
+MANIFEST = "manifest.json"
+# 2: matches carry the ingestion revision
+# 3: deliveries carry the batting team
+FORMAT_VERSION = 3
+
+
+def _save(directory, name, array):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _load(directory, name):
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+
+
+def export_snapshot(store, directory):
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"format": FORMAT_VERSION, "created": time.time(), "tables": {}, "vocabularies": []}
+
+    for name, vocabulary in store.vocabularies.items():
+        # Fixed-width unicode (or numeric) arrays need no pickling to be mapped
+        _save(directory, f"vocab.{name}", np.asarray(list(vocabulary)))
+        manifest["vocabularies"].append(name)
+
+    for table_name in ("deliveries", "matches"):
+        table = getattr(store, table_name)
+        for column, array in table.columns.items():
+            _save(directory, f"{table_name}.{column}", array)
+        manifest["tables"][table_name] = {
+            "columns": list(table.columns),
+            "categories": table.categories,
+            "rows": len(table),
+        }
+
+    # Write the manifest last so a half-written snapshot is never loaded
+    tmp = os.path.join(directory, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+    return manifest
+
+
+def load_snapshot(directory):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest["format"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest['format']} in {directory}")
+
+    vocabularies = {name: _load(directory, f"vocab.{name}") for name in manifest["vocabularies"]}
+    tables = {}
+    for table_name, spec in manifest["tables"].items():
+        columns = {column: _load(directory, f"{table_name}.{column}") for column in spec["columns"]}
+        tables[table_name] = Table(columns, spec["categories"], vocabularies)
+    return ColumnStore(tables["deliveries"], tables["matches"])
+
+
+if __name__ == "__main__":
+    # python -m utils.snapshot <directory>  (reads from the configured database)
+    from utils.store import load_from_database
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "snapshot"
+    started = time.perf_counter()
+    info = export_snapshot(load_from_database(), target)
+    print(f"Wrote {info['tables']['deliveries']['rows']} deliveries and "
+          f"{info['tables']['matches']['rows']} matches to {target} in {time.perf_counter() - started:.1f}s")
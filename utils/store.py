@@ -0,0 +1,254 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.db_connections import execute, read_copy
+from utils.data_version import data_version
+from utils.queries import store_deliveries_query, store_innings_query, store_matches_query, players_query, teams_query
+from utils.plot_utils import PHASES, phase_codes
+
+# Columns that are stored as integer codes, and the vocabulary each one shares
+DELIVERY_CATEGORIES = {
+    'batter': 'players',
+    'bowler': 'players',
+    'non_striker': 'players',
+    'fielder': 'players',
+    'dismissal_kind': 'dismissal_kinds',
+}
+MATCH_CATEGORIES = {
+    'season': 'seasons',
+    'venue': 'venues',
+    'city': 'cities',
+    'team_1': 'teams',
+    'team_2': 'teams',
+    'toss_winner': 'teams',
+    'winner': 'teams',
+    'toss_decision': 'toss_decisions',
+    'player_of_match': 'players',
+}
+DERIVED_DELIVERY_CATEGORIES = dict(DELIVERY_CATEGORIES, season='seasons', venue='venues', phase='phases',
+                                   batting_team='teams')
+
+
+def _vocabulary(*series):
+    values = pd.concat([s.dropna() for s in series], ignore_index=True)
+    return np.sort(values.unique())
+
+
+def _encode(series, vocabulary):
+    return pd.Index(vocabulary).get_indexer(series).astype(np.int32)
+
+
+def _batting_team(match_columns, match_row, inning, vocabularies, innings):
+    # The batting side of each delivery, as recorded per innings at ingest.
+    # Innings without a record (matches loaded before the innings table
+    # existed) fall back to the toss: the winner bats first if it chose to,
+    # otherwise the other team does, and odd innings (and super overs) follow.
+    team_1, team_2, toss_winner = match_columns['team_1'], match_columns['team_2'], match_columns['toss_winner']
+    decision = match_columns['toss_decision']
+    bat = pd.Index(vocabularies['toss_decisions']).get_indexer(['bat'])[0]
+    other = np.where(toss_winner == team_1, team_2, team_1)
+    first = np.where((toss_winner < 0) | (decision < 0), -1, np.where(decision == bat, toss_winner, other))
+    second = np.where(first == team_1, team_2, np.where(first == team_2, team_1, -1))
+    batting = np.where(inning % 2 == 1, first[match_row], second[match_row]).astype(np.int32)
+    if innings is not None and len(innings):
+        keys = innings['match_id'].to_numpy(np.int64) * 256 + innings['inning'].to_numpy(np.int64)
+        teams = _encode(innings['batting_team'], vocabularies['teams'])
+        order = np.argsort(keys, kind='stable')
+        keys, teams = keys[order], teams[order]
+        wanted = match_columns['match_id'][match_row] * 256 + inning.astype(np.int64)
+        at = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        recorded = (keys[at] == wanted) & (teams[at] >= 0)
+        batting[recorded] = teams[at[recorded]]
+    return batting
+
+
+class Table:
+    def __init__(self, columns, categories, vocabularies):
+        self.columns = columns
+        self.categories = categories
+        self.vocabularies = vocabularies
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def labels(self, name):
+        return self.vocabularies[self.categories[name]]
+
+    def code(self, name, value):
+        labels = self.labels(name)
+        i = np.searchsorted(labels, value)
+        if i < len(labels) and labels[i] == value:
+            return int(i)
+        # Small vocabularies kept in display order (phases) are not sorted
+        found = np.flatnonzero(labels == value)
+        return int(found[0]) if len(found) else -1
+
+    def equals(self, name, value):
+        code = self.code(name, value)
+        if code < 0:
+            return np.zeros(len(self), dtype=bool)
+        return self.columns[name] == code
+
+    def where(self, name, value):
+        return np.flatnonzero(self.equals(name, value))
+
+    def decode(self, name, codes):
+        if name in self.categories:
+            labels = self.labels(name)
+            return np.where(codes >= 0, labels[codes], None)
+        return codes
+
+    def frame(self, rows, columns=None):
+        columns = columns or list(self.columns)
+        return pd.DataFrame({name: self.decode(name, self.columns[name][rows]) for name in columns})
+
+    def aggregate(self, rows, by, **aggs):
+        # Vectorized GROUP BY over the selected rows; aggs map an output
+        # column to (source column, 'sum' | 'count' | 'nunique')
+        keys = self.columns[by][rows]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        out = {by: self.decode(by, groups)}
+        for name, (column, how) in aggs.items():
+            if how == 'count':
+                out[name] = np.bincount(inverse, minlength=len(groups))
+            elif how == 'sum':
+                values = self.columns[column][rows]
+                out[name] = np.bincount(inverse, weights=values, minlength=len(groups)).astype(np.int64)
+            elif how == 'nunique':
+                pairs = np.unique(np.stack([inverse, self.columns[column][rows]]), axis=1)
+                out[name] = np.bincount(pairs[0], minlength=len(groups))
+            else:
+                raise ValueError(f"Unknown aggregation: {how}")
+        return pd.DataFrame(out)
+
+
+class ColumnStore:
+    def __init__(self, deliveries, matches):
+        self.deliveries = deliveries
+        self.matches = matches
+        self.vocabularies = deliveries.vocabularies
+        self._derived = {}
+        self._build_locks = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frames(cls, deliveries, matches, players=None, teams=None, innings=None):
+        vocabularies = {
+            'players': _vocabulary(deliveries['batter'], deliveries['bowler'], deliveries['non_striker'],
+                                   deliveries['fielder'], matches['player_of_match']),
+            'dismissal_kinds': _vocabulary(deliveries['dismissal_kind']),
+            'seasons': _vocabulary(matches['season']),
+            'venues': _vocabulary(matches['venue']),
+            'cities': _vocabulary(matches['city']),
+            'teams': _vocabulary(matches['team_1'], matches['team_2'], matches['toss_winner'], matches['winner'],
+                                 *([] if innings is None else [innings['batting_team']])),
+            'toss_decisions': _vocabulary(matches['toss_decision']),
+            'phases': PHASES,
+        }
+        # Names listed on the player and team pages, from their own tables
+        vocabularies['player_names'] = vocabularies['players'] if players is None else _vocabulary(players)
+        vocabularies['team_names'] = vocabularies['teams'] if teams is None else _vocabulary(teams)
+
+        match_columns = {
+            'match_id': matches['match_id'].to_numpy(np.int64),
+            'match_date': pd.to_datetime(matches['match_date']).to_numpy('datetime64[D]'),
+            # Bumped each time ingestion replaces a match with a corrected file
+            'revision': (matches['revision'].to_numpy(np.int32) if 'revision' in matches
+                         else np.zeros(len(matches), dtype=np.int32)),
+        }
+        for name, vocab in MATCH_CATEGORIES.items():
+            match_columns[name] = _encode(matches[name], vocabularies[vocab])
+
+        match_row = np.searchsorted(match_columns['match_id'], deliveries['match_id'].to_numpy(np.int64))
+        match_row = np.minimum(match_row, len(matches) - 1).astype(np.int32)
+        over_number = deliveries['over_number'].to_numpy(np.int16)
+        inning = deliveries['inning'].to_numpy(np.int8)
+
+        delivery_columns = {
+            'match_id': deliveries['match_id'].to_numpy(np.int64),
+            'match_row': match_row,
+            'inning': inning,
+            'over_number': over_number,
+            'ball_number': deliveries['ball_number'].to_numpy(np.int16),
+            'runs_batter': deliveries['runs_batter'].to_numpy(np.int16),
+            'runs_extras': deliveries['runs_extras'].to_numpy(np.int16),
+            'runs_total': deliveries['runs_total'].to_numpy(np.int16),
+            'wicket': deliveries['wicket'].fillna(False).to_numpy(bool),
+            'phase': phase_codes(over_number),
+            'season': match_columns['season'][match_row],
+            'venue': match_columns['venue'][match_row],
+            'batting_team': _batting_team(match_columns, match_row, inning, vocabularies, innings),
+        }
+        for name, vocab in DELIVERY_CATEGORIES.items():
+            delivery_columns[name] = _encode(deliveries[name], vocabularies[vocab])
+
+        return cls(Table(delivery_columns, DERIVED_DELIVERY_CATEGORIES, vocabularies),
+                   Table(match_columns, MATCH_CATEGORIES, vocabularies))
+
+    @property
+    def player_names(self):
+        return self.vocabularies['player_names'].tolist()
+
+    @property
+    def team_names(self):
+        return self.vocabularies['team_names'].tolist()
+
+    def derived(self, name, build):
+        # Structures built from the store (leaderboards, indexes, ...) live and
+        # die with it, so a reload never serves them from stale data. Built
+        # ones are returned without locking; each name builds under its own
+        # lock, so a slow build only holds up callers of that name and may
+        # itself use other derived structures.
+        built = self._derived.get(name)
+        if built is not None:
+            return built
+        with self._lock:
+            lock = self._build_locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+            return self._derived[name]
+
+    def match_row(self, match_id):
+        return int(np.searchsorted(self.matches['match_id'], match_id))
+
+    def match_deliveries(self, match_id):
+        # Deliveries are ordered by match_id, so one match is a contiguous slice
+        match_ids = self.deliveries['match_id']
+        return np.arange(np.searchsorted(match_ids, match_id, 'left'), np.searchsorted(match_ids, match_id, 'right'))
+
+    def deliveries_in(self, match_rows):
+        mask = np.zeros(len(self.matches), dtype=bool)
+        mask[match_rows] = True
+        return np.flatnonzero(mask[self.deliveries['match_row']])
+
+
+def load_from_database():
+    return ColumnStore.from_frames(
+        read_copy(store_deliveries_query),
+        read_copy(store_matches_query),
+        innings=read_copy(store_innings_query),
+        players=execute(players_query)['player_name'],
+        teams=execute(teams_query)['team_name'],
+    )
+
+
+def get_store():
+    return _load_store(data_version())
+
+
+@st.cache_resource(max_entries=1)
+def _load_store(version):
+    # With IPL_SNAPSHOT_DIR set the store is mapped from a local snapshot and
+    # the app never needs to reach Postgres
+    snapshot_dir = os.environ.get("IPL_SNAPSHOT_DIR")
+    if snapshot_dir:
+        from utils.snapshot import load_snapshot
+        return load_snapshot(snapshot_dir)
+    return load_from_database()
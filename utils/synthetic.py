@@ -0,0 +1,222 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+# Synthetic ball-by-ball data in the dashboard's schema (matches, deliveries,
+# players, teams). Scale 1 is 17 seasons of a 10-team league, about 1,600
+# matches and 370,000 deliveries; scale multiplies the number of seasons.
+
+# Outcome of a legal delivery for the batter: runs 0, 1, 2, 3, 4, 6, or a wicket
+OUTCOME_RUNS = np.array([0, 1, 2, 3, 4, 6, 0])
+OUTCOME_PROBS = np.array([0.35, 0.365, 0.065, 0.005, 0.11, 0.055, 0.05])
+WICKET = len(OUTCOME_RUNS) - 1
+EXTRA_PROB = 0.06
+DISMISSALS = np.array(['caught', 'bowled', 'lbw', 'run out', 'stumped', 'caught and bowled'])
+DISMISSAL_PROBS = np.array([0.6, 0.17, 0.1, 0.08, 0.03, 0.02])
+BALLS_PER_INNINGS = 120
+DELIVERY_DTYPES = {'inning': np.int8, 'over_number': np.int16, 'ball_number': np.int16,
+                   'runs_batter': np.int16, 'runs_extras': np.int16, 'runs_total': np.int16}
+
+COPY_BATCH_ROWS = 500_000
+
+# Tables the dashboard reads, for loading generated data into an empty database
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS public.teams (team_name text);
+CREATE TABLE IF NOT EXISTS public.players (player_name text);
+CREATE TABLE IF NOT EXISTS public.matches (
+    match_id bigint PRIMARY KEY, season text, match_date date, city text, venue text,
+    team_1 text, team_2 text, toss_winner text, toss_decision text, winner text, player_of_match text
+);
+CREATE TABLE IF NOT EXISTS public.innings (match_id bigint, inning smallint, batting_team text);
+CREATE TABLE IF NOT EXISTS public.deliveries (
+    match_id bigint, inning smallint, over_number smallint, ball_number smallint,
+    batter text, bowler text, non_striker text, runs_batter smallint, runs_extras smallint,
+    runs_total smallint, wicket boolean, dismissal_kind text, fielder text
+);
+"""
+
+
+def _league(rng, n_teams, players_per_team):
+    teams = np.array([f"Team {i + 1:02d}" for i in range(n_teams)])
+    venues = np.array([f"Stadium {i + 1:02d}" for i in range(n_teams)])
+    cities = np.array([f"City {i + 1:02d}" for i in range(n_teams)])
+    squads = np.array([[f"Player {t + 1:02d}-{p + 1:02d}" for p in range(players_per_team)]
+                       for t in range(n_teams)])
+    return teams, venues, cities, squads
+
+
+def _fixtures(rng, seasons, n_teams, first_season):
+    # Double round robin per season plus four playoff games
+    home, away = np.meshgrid(np.arange(n_teams), np.arange(n_teams), indexing='ij')
+    pairs = np.stack([home.ravel(), away.ravel()], axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    rows = []
+    for s in range(seasons):
+        season_pairs = pairs[rng.permutation(len(pairs))]
+        playoffs = np.stack([rng.choice(n_teams, 2, replace=False) for _ in range(4)])
+        season_pairs = np.concatenate([season_pairs, playoffs])
+        start = np.datetime64(f"{first_season + s}-03-25")
+        dates = start + np.arange(len(season_pairs)) * 60 // len(season_pairs)
+        rows.append((np.full(len(season_pairs), first_season + s), dates, season_pairs))
+    season = np.concatenate([r[0] for r in rows])
+    dates = np.concatenate([r[1] for r in rows])
+    pairs = np.concatenate([r[2] for r in rows])
+    return season, dates, pairs[:, 0], pairs[:, 1]
+
+
+def _simulate_innings(rng, n, targets=None):
+    # Ball-by-ball simulation vectorized across n innings; the loop runs over
+    # the 120 ball slots, not over innings
+    striker = np.zeros(n, dtype=np.int64)
+    non_striker = np.ones(n, dtype=np.int64)
+    next_in = np.full(n, 2)
+    wickets = np.zeros(n, dtype=np.int64)
+    score = np.zeros(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+
+    columns = {k: [] for k in ('innings', 'ball', 'striker', 'non_striker', 'runs', 'extras', 'wicket')}
+    for ball in range(BALLS_PER_INNINGS):
+        idx = np.flatnonzero(active)
+        if len(idx) == 0:
+            break
+        outcome = rng.choice(len(OUTCOME_PROBS), size=len(idx), p=OUTCOME_PROBS)
+        runs = OUTCOME_RUNS[outcome]
+        extras = (rng.random(len(idx)) < EXTRA_PROB).astype(np.int64)
+        out = outcome == WICKET
+
+        columns['innings'].append(idx)
+        columns['ball'].append(np.full(len(idx), ball))
+        columns['striker'].append(striker[idx].copy())
+        columns['non_striker'].append(non_striker[idx].copy())
+        columns['runs'].append(runs)
+        columns['extras'].append(extras)
+        columns['wicket'].append(out)
+
+        score[idx] += runs + extras
+        # New batter replaces the dismissed striker
+        striker[idx[out]] = next_in[idx[out]]
+        next_in[idx[out]] += 1
+        wickets[idx[out]] += 1
+        # Odd runs and the end of an over swap strike
+        swap = (runs % 2 == 1) ^ (ball % 6 == 5)
+        s, ns = striker[idx[swap]].copy(), non_striker[idx[swap]].copy()
+        striker[idx[swap]], non_striker[idx[swap]] = ns, s
+
+        active[idx[wickets[idx] >= 10]] = False
+        if targets is not None:
+            active[idx[score[idx] >= targets[idx]]] = False
+
+    balls = {k: np.concatenate(v) for k, v in columns.items()}
+    return balls, score
+
+
+def generate(scale=1, seasons=17, n_teams=10, players_per_team=25, first_season=2008, seed=0):
+    rng = np.random.default_rng(seed)
+    seasons = seasons * scale
+    teams, venues, cities, squads = _league(rng, n_teams, players_per_team)
+    season, dates, home, away = _fixtures(rng, seasons, n_teams, first_season)
+    n = len(season)
+    match_id = np.arange(1, n + 1)
+
+    toss = np.where(rng.random(n) < 0.5, home, away)
+    toss_decision = np.where(rng.random(n) < 0.6, 'field', 'bat')
+    bats_first = np.where(toss_decision == 'bat', toss, np.where(toss == home, away, home))
+    bats_second = np.where(bats_first == home, away, home)
+
+    first, first_score = _simulate_innings(rng, n)
+    second, second_score = _simulate_innings(rng, n, targets=first_score + 1)
+    chased = second_score > first_score
+    tied = second_score == first_score
+    winner = np.where(chased, bats_second, bats_first)
+
+    # Player columns are built as codes into the flattened squads and become
+    # categoricals directly, so 100x volumes never materialise name strings
+    parts = []
+    for inning, balls, batting, bowling in ((1, first, bats_first, bats_second), (2, second, bats_second, bats_first)):
+        m = balls['innings']
+        size = len(m)
+        over = balls['ball'] // 6
+        bat_base = batting[m] * players_per_team
+        bowl_base = bowling[m] * players_per_team
+        # The last six of each squad bowl in rotation; fielders come from the whole squad
+        bowler = bowl_base + players_per_team - 6 + over % 6
+        dismissal = np.where(balls['wicket'], rng.choice(len(DISMISSALS), size, p=DISMISSAL_PROBS), -1)
+        kind = DISMISSALS[np.maximum(dismissal, 0)]
+        fielder = np.where(np.isin(kind, ['caught', 'run out', 'stumped']) & (dismissal >= 0),
+                           bowl_base + rng.integers(0, players_per_team, size), -1)
+        fielder = np.where((kind == 'caught and bowled') & (dismissal >= 0), bowler, fielder)
+        parts.append({
+            'match_id': match_id[m],
+            'inning': np.full(size, inning),
+            'over_number': over + 1,
+            'ball_number': balls['ball'] % 6 + 1,
+            'batter': bat_base + np.minimum(balls['striker'], players_per_team - 1),
+            'bowler': bowler,
+            'non_striker': bat_base + np.minimum(balls['non_striker'], players_per_team - 1),
+            'runs_batter': balls['runs'],
+            'runs_extras': balls['extras'],
+            'runs_total': balls['runs'] + balls['extras'],
+            'wicket': balls['wicket'],
+            'dismissal_kind': dismissal,
+            'fielder': fielder,
+        })
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    order = np.lexsort((columns['ball_number'], columns['over_number'], columns['inning'], columns['match_id']))
+    columns = {name: values[order].astype(DELIVERY_DTYPES.get(name, values.dtype)) for name, values in columns.items()}
+    player_names = squads.ravel()
+    for name in ('batter', 'bowler', 'non_striker', 'fielder'):
+        columns[name] = pd.Categorical.from_codes(columns[name], player_names)
+    columns['dismissal_kind'] = pd.Categorical.from_codes(columns['dismissal_kind'], DISMISSALS)
+    deliveries = pd.DataFrame(columns)
+
+    # Player of the match: the winning side's top scorer
+    runs = deliveries.groupby(['match_id', 'batter'], observed=True)['runs_batter'].sum().reset_index()
+    top = runs.sort_values('runs_batter', ascending=False).drop_duplicates('match_id').set_index('match_id')['batter']
+
+    matches = pd.DataFrame({
+        'match_id': match_id,
+        'season': season,
+        'match_date': dates,
+        'city': cities[home],
+        'venue': venues[home],
+        'team_1': teams[home],
+        'team_2': teams[away],
+        'toss_winner': teams[toss],
+        'toss_decision': toss_decision,
+        'winner': np.where(tied, None, teams[winner]),
+        'player_of_match': top.reindex(match_id).to_numpy(),
+    })
+    innings = pd.DataFrame({
+        'match_id': np.concatenate([match_id, match_id]),
+        'inning': np.repeat([1, 2], n),
+        'batting_team': teams[np.concatenate([bats_first, bats_second])],
+    }).sort_values(['match_id', 'inning'], ignore_index=True)
+    players = pd.DataFrame({'player_name': player_names})
+    teams = pd.DataFrame({'team_name': teams})
+    return {'matches': matches, 'innings': innings, 'deliveries': deliveries, 'players': players, 'teams': teams}
+
+
+def load_into_postgres(conn, frames):
+    # Replace the contents of a scratch database with generated frames, bulk
+    # loaded with COPY ... FROM STDIN. Never point this at the live database.
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA)
+        cur.execute("TRUNCATE public.deliveries, public.innings, public.matches, public.players, public.teams")
+        for table in ('teams', 'players', 'matches', 'innings', 'deliveries'):
+            df = frames[table]
+            sql = f"COPY public.{table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)"
+            for start in range(0, len(df), COPY_BATCH_ROWS):
+                buffer = io.StringIO()
+                df.iloc[start:start + COPY_BATCH_ROWS].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cur.copy_expert(sql, buffer)
+    conn.commit()
+    # Indexes, manifest and aggregate tables as in production; the generated
+    # matches have no source files, so the manifest starts empty
+    from utils import aggregates, migrations
+    migrations.migrate(conn)
+    aggregates.rebuild(conn)
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE public.ingest_manifest")
+        cur.execute("ANALYZE")
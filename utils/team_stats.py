@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from utils.result_cache import cached_result
+from utils.partnerships import get_partnerships
+from utils.store import get_store
+
+
+@cached_result
+def load_teams(version):
+    return get_store().team_names
+
+
+def team_match_rows(matches, team_name):
+    return np.union1d(matches.where('team_1', team_name), matches.where('team_2', team_name))
+
+
+@cached_result
+def get_team_overview(team_name, version):
+    matches = get_store().matches
+    rows = team_match_rows(matches, team_name)
+    matches_played = len(rows)
+    wins = np.count_nonzero(matches.equals('winner', team_name)[rows])
+    win_pct = round(wins * 100.0 / matches_played, 2) if matches_played else 0.0
+    # One row of mixed types, as the SQL returned it; object dtype keeps the
+    # counts integers instead of upcasting them to the percentage's float
+    return pd.Series({'matches_played': matches_played, 'wins': int(wins), 'win_pct': win_pct}, dtype=object)
+
+
+@cached_result
+def top_run_scorers(team_name, version):
+    store = get_store()
+    rows = store.deliveries_in(team_match_rows(store.matches, team_name))
+    df = store.deliveries.aggregate(rows, 'batter', runs=('runs_batter', 'sum'))
+    return df.nlargest(5, 'runs').reset_index(drop=True)
+
+
+@cached_result
+def top_wicket_takers(team_name, version):
+    store = get_store()
+    rows = store.deliveries_in(team_match_rows(store.matches, team_name))
+    rows = rows[store.deliveries['wicket'][rows]]
+    df = store.deliveries.aggregate(rows, 'bowler', wickets=('bowler', 'count'))
+    return df.nlargest(5, 'wickets').reset_index(drop=True)
+
+
+@cached_result
+def win_distribution_by_venue(team_name, version):
+    matches = get_store().matches
+    df = matches.aggregate(matches.where('winner', team_name), 'venue', wins=('venue', 'count'))
+    return df.sort_values('wins', ascending=False).reset_index(drop=True)
+
+
+@cached_result
+def season_wise_performance(team_name, version):
+    matches = get_store().matches
+    rows = team_match_rows(matches, team_name)
+    df = matches.aggregate(rows, 'season', matches=('season', 'count'))
+    won = rows[matches.equals('winner', team_name)[rows]]
+    wins = matches.aggregate(won, 'season', wins=('season', 'count'))
+    df = df.merge(wins, on='season', how='left')
+    df['wins'] = df['wins'].fillna(0).astype(int)
+    return df
+
+
+@cached_result
+def toss_decision_stats(team_name, version):
+    matches = get_store().matches
+    return matches.aggregate(matches.where('toss_winner', team_name), 'toss_decision', count=('toss_decision', 'count'))
+
+
+@cached_result
+def top_partnerships(team_name, version):
+    return get_partnerships().for_team(team_name)
+
+
+@cached_result
+def partnership_records(team_name, version):
+    return get_partnerships().records_by_wicket(team_name)
+
+
+# Per-entity loaders, in page order; each takes (name, version)
+loaders = [
+    get_team_overview,
+    top_run_scorers,
+    top_wicket_takers,
+    win_distribution_by_venue,
+    season_wise_performance,
+    toss_decision_stats,
+    top_partnerships,
+    partnership_records,
+]
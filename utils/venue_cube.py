@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from utils.store import get_store
+
+AXES = ['venue', 'season', 'inning', 'over']
+METRICS = ['runs', 'batter_runs', 'extras', 'balls', 'wickets', 'fours', 'sixes', 'balls_decided']
+
+
+class VenueCube:
+    # Dense venue x season x inning x over cube of per-delivery sums, built in
+    # one pass over the deliveries store, with distinct innings and match
+    # counts kept alongside at the coarser grains they are defined on. Venue
+    # questions become a slice and a sum instead of a scan over deliveries.
+    def __init__(self, store):
+        d, m = store.deliveries, store.matches
+        self.venues = d.labels('venue')
+        self.seasons = d.labels('season')
+        venue, season = d['venue'], d['season']
+        keep = np.flatnonzero((venue >= 0) & (season >= 0))
+        venue, season = venue[keep], season[keep]
+        inning = d['inning'][keep].astype(np.int64) - 1
+        over = d['over_number'][keep].astype(np.int64)
+        self.shape = (len(self.venues), len(self.seasons),
+                      int(inning.max()) + 1 if len(keep) else 1,
+                      int(over.max()) + 1 if len(keep) else 1)
+        cell = np.ravel_multi_index((venue, season, inning, over), self.shape)
+        size = int(np.prod(self.shape))
+
+        runs_batter = d['runs_batter'][keep]
+        match_row = d['match_row'][keep]
+        weights = {
+            'runs': d['runs_total'][keep],
+            'batter_runs': runs_batter,
+            'extras': d['runs_extras'][keep],
+            'balls': None,
+            'wickets': d['dismissal_kind'][keep] >= 0,
+            'fours': runs_batter == 4,
+            'sixes': runs_batter == 6,
+            # Deliveries of matches with a result, as the venue summary counts them
+            'balls_decided': m['winner'][match_row] >= 0,
+        }
+        self.cube = {metric: np.bincount(cell, weights=weights[metric], minlength=size)
+                     .astype(np.int64).reshape(self.shape) for metric in METRICS}
+
+        # Innings and matches that had deliveries, counted once each; venue and
+        # season come from the match, which shares the deliveries' vocabularies
+        innings = np.unique(match_row.astype(np.int64) * self.shape[2] + inning)
+        match_of, inning_of = innings // self.shape[2], innings % self.shape[2]
+        self.innings = np.bincount(
+            np.ravel_multi_index((m['venue'][match_of], m['season'][match_of], inning_of), self.shape[:3]),
+            minlength=int(np.prod(self.shape[:3]))).reshape(self.shape[:3])
+        played = np.unique(match_row)
+        self.matches = np.bincount(
+            np.ravel_multi_index((m['venue'][played], m['season'][played]), self.shape[:2]),
+            minlength=int(np.prod(self.shape[:2]))).reshape(self.shape[:2])
+
+    def _slice(self, array, venue):
+        if venue is None:
+            return array
+        code = np.flatnonzero(self.venues == venue)
+        return array[code[:1]]
+
+    def total(self, metric, venue=None):
+        array = self.matches if metric == 'matches' else self.innings if metric == 'innings' else self.cube[metric]
+        return int(self._slice(array, venue).sum())
+
+    def by(self, axis, metrics, venue=None):
+        # Sum the metrics over every axis but one, for one venue or all of
+        # them; only the axis values that saw any deliveries are kept
+        keep = AXES.index(axis)
+        out = {}
+        for metric in metrics:
+            array = self.innings if metric == 'innings' else self.cube[metric]
+            array = self._slice(array, venue)
+            out[metric] = array.sum(axis=tuple(i for i in range(array.ndim) if i != keep))
+        balls = self._slice(self.cube['balls'], venue).sum(axis=tuple(i for i in range(4) if i != keep))
+        present = np.flatnonzero(balls > 0)
+        labels = {'venue': self.venues, 'season': self.seasons}
+        keys = labels[axis][present] if axis in labels else present + (1 if axis == 'inning' else 0)
+        return pd.DataFrame({axis: keys, **{metric: values[present] for metric, values in out.items()}})
+
+    def venue_totals(self):
+        # Runs, wickets and average score per innings for every venue, as the
+        # venue_totals query reads them from agg_venue
+        present = np.flatnonzero(self.matches.sum(axis=1) > 0)
+        runs = self.cube['runs'].sum(axis=(1, 2, 3))[present]
+        matches = self.matches.sum(axis=1)[present]
+        return pd.DataFrame({
+            'venue': self.venues[present],
+            'total_runs': runs,
+            'total_wickets': self.cube['wickets'].sum(axis=(1, 2, 3))[present],
+            'avg_score': (runs / matches / 2).round(2),
+            'balls': self.cube['balls'].sum(axis=(1, 2, 3))[present],
+            'matches': matches,
+        })
+
+
+def get_venue_cube():
+    return get_store().derived('venue_cube', VenueCube)
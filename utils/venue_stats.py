@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from utils.result_cache import cached_result
+from utils.store import get_store
+from utils.venue_cube import get_venue_cube
+
+
+@cached_result
+def load_venues(version):
+    return get_store().matches.labels('venue').tolist()
+
+
+@cached_result
+def venue_summary(venue, version):
+    cube = get_venue_cube()
+    return pd.Series({
+        'matches': cube.total('matches', venue),
+        'total_runs': cube.total('runs', venue),
+        'results_count': cube.total('balls_decided', venue),
+    })
+
+
+@cached_result
+def toss_decision_trend(venue, version):
+    matches = get_store().matches
+    return matches.aggregate(matches.where('venue', venue), 'toss_decision', count=('toss_decision', 'count'))
+
+
+@cached_result
+def average_scores_per_innings(venue, version):
+    df = get_venue_cube().by('inning', ['batter_runs', 'extras', 'innings'], venue)
+    df['avg_runs'] = (df['batter_runs'] + df['extras']) / df['innings']
+    return df[['inning', 'avg_runs']]
+
+
+@cached_result
+def top_performers(venue, version):
+    deliveries = get_store().deliveries
+    df = deliveries.aggregate(deliveries.where('venue', venue), 'batter', runs=('runs_batter', 'sum'))
+    return df.nlargest(5, 'runs').reset_index(drop=True)
+
+
+@cached_result
+def venue_avg_runs(selected_venue, version):
+    cube = get_venue_cube()
+    matches = cube.total('matches', selected_venue)
+    return pd.Series({'avg_runs_per_match': cube.total('runs', selected_venue) / matches / 2 if matches else np.nan})
+
+
+@cached_result
+def team_win_percentage(selected_venue, version):
+    matches = get_store().matches
+    rows = matches.where('venue', selected_venue)
+    rows = rows[matches['winner'][rows] >= 0]
+    return matches.aggregate(rows, 'winner', wins=('winner', 'count'))
+
+
+@cached_result
+def toss_to_win(selected_venue, version):
+    matches = get_store().matches
+    rows = matches.where('venue', selected_venue)
+    toss_winner, winner = matches['toss_winner'][rows], matches['winner'][rows]
+    return pd.Series({
+        'toss_won': len(rows),
+        'matches_won_after_toss': np.count_nonzero((toss_winner == winner) & (winner >= 0)),
+    })
+
+
+@cached_result
+def abandoned_matches(selected_venue, version):
+    matches = get_store().matches
+    rows = matches.where('venue', selected_venue)
+    return pd.Series({'abandoned_matches': np.count_nonzero(matches.equals('winner', 'No Result')[rows])})
+
+
+@cached_result
+def heatmap_data(selected_venue, version):
+    return get_venue_cube().by('over', ['runs'], selected_venue).rename(columns={'over': 'over_number'})
+
+
+# Per-entity loaders, in page order; each takes (name, version)
+loaders = [
+    venue_summary,
+    toss_decision_trend,
+    average_scores_per_innings,
+    top_performers,
+    venue_avg_runs,
+    team_win_percentage,
+    toss_to_win,
+    abandoned_matches,
+    heatmap_data,
+]
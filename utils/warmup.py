@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from utils import player_stats, team_stats, venue_stats
+from utils.data_version import data_version, entity_version
+
+# Background pre-warming of the per-entity page caches. Entities are warmed
+# most-viewed first; view counts persist across restarts so the first
+# users after a deploy find the popular pages already cached.
+VIEWS_FILE = os.environ.get("IPL_VIEWS_FILE", "view_counts.json")
+WARMUP_WORKERS = int(os.environ.get("IPL_WARMUP_WORKERS", 2))
+# Pause between entities, and how long to back off after interactive traffic
+WARMUP_PAUSE_SECONDS = float(os.environ.get("IPL_WARMUP_PAUSE_SECONDS", 0.05))
+WARMUP_QUIET_SECONDS = float(os.environ.get("IPL_WARMUP_QUIET_SECONDS", 1.0))
+VIEWS_SAVE_SECONDS = 60
+
+_views_lock = threading.Lock()
+_views = None
+_views_saved_at = 0.0
+_last_interactive = 0.0
+
+
+def _load_views():
+    try:
+        with open(VIEWS_FILE) as f:
+            return Counter({tuple(key.split(":", 1)): count for key, count in json.load(f).items()})
+    except (OSError, ValueError):
+        return Counter()
+
+
+def _save_views():
+    global _views_saved_at
+    tmp = VIEWS_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({f"{kind}:{name}": count for (kind, name), count in _views.items()}, f)
+    os.replace(tmp, VIEWS_FILE)
+    _views_saved_at = time.monotonic()
+
+
+def view_counts():
+    global _views
+    with _views_lock:
+        if _views is None:
+            _views = _load_views()
+        return Counter(_views)
+
+
+def record_view(kind, name):
+    global _views, _last_interactive
+    _last_interactive = time.monotonic()
+    with _views_lock:
+        if _views is None:
+            _views = _load_views()
+        _views[(kind, name)] += 1
+        if time.monotonic() - _views_saved_at >= VIEWS_SAVE_SECONDS:
+            try:
+                _save_views()
+            except OSError:
+                pass
+
+
+class WarmupScheduler:
+    def __init__(self, workers=WARMUP_WORKERS, pause=WARMUP_PAUSE_SECONDS, quiet=WARMUP_QUIET_SECONDS):
+        self.workers = workers
+        self.pause = pause
+        self.quiet = quiet
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _tasks(self):
+        version = data_version()
+        entities = (
+            [('team', name, team_stats.loaders) for name in team_stats.load_teams(version)]
+            + [('venue', name, venue_stats.loaders) for name in venue_stats.load_venues(version)]
+            + [('player', name, player_stats.loaders) for name in player_stats.load_players(version)]
+        )
+        views = view_counts()
+        # Most-viewed first; the sort is stable so ties keep teams, venues, players order
+        return sorted(entities, key=lambda task: -views[(task[0], task[1])])
+
+    def _warm(self, task):
+        kind, name, loaders = task
+        # Yield to interactive sessions: wait for a quiet spell before each entity
+        while time.monotonic() - _last_interactive < self.quiet:
+            time.sleep(self.quiet)
+        try:
+            version = entity_version(kind, name)
+            for loader in loaders:
+                loader(name, version)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+        with self._lock:
+            self.done += 1
+        time.sleep(self.pause)
+
+    def _run(self):
+        tasks = self._tasks()
+        with self._lock:
+            self.total = len(tasks)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warmup") as executor:
+            list(executor.map(self._warm, tasks))
+        self.finished_at = time.time()
+
+    def start(self):
+        if self._thread is None:
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def progress(self):
+        with self._lock:
+            return {
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'fraction': self.done / self.total if self.total else 0.0,
+                'running': self._thread is not None and self._thread.is_alive(),
+            }
+
+
+@st.cache_resource(max_entries=1)
+def start_warmup(version):
+    # One warm-up run per data version, so a load re-warms the changed entities
+    return WarmupScheduler().start()
@@ -0,0 +1,318 @@
+import argparse
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils.plot_utils import phase_codes
+from utils.result_cache import cached_result
+from utils.store import get_store
+
+# Monte Carlo win probability. Every legal ball is drawn from an outcome
+# distribution (runs 0-7+, with or without a wicket) estimated from the
+# historical balls per phase and wickets lost, shrunk towards the
+# all-venue rates for the match venue. From each ball state the rest of the
+# innings is simulated for every path at once, one vectorized step per ball.
+SIMULATIONS = int(os.environ.get("IPL_WIN_PROB_SIMULATIONS", 20_000))
+# Simulated venues kept in memory per replica; each table is about 4MB
+CACHED_VENUES = int(os.environ.get("IPL_WIN_PROB_CACHED_VENUES", 8))
+# Weight, in deliveries, of the all-venue rates in each venue's distribution
+PRIOR_BALLS = 600
+# Outcomes are sampled from an inverse-CDF table of this many slots per
+# distribution, so a draw is one lookup; rarer outcomes than 1/RESOLUTION
+# are rounded to the nearest slot
+RESOLUTION = 4096
+BALLS = 120
+WICKETS = 10
+
+MAX_RUNS = 7
+OUTCOMES = 2 * (MAX_RUNS + 1)
+OUTCOME_RUNS = np.tile(np.arange(MAX_RUNS + 1), 2).astype(np.int16)
+OUTCOME_WICKETS = np.repeat([0, 1], MAX_RUNS + 1).astype(np.int8)
+# Wickets lost 0-2, 3-5 and 6+ bat differently enough to estimate apart
+N_BUCKETS = 3
+WICKET_BUCKETS = np.searchsorted([2, 5], np.arange(WICKETS + 1), side='left')
+PHASE_OF_BALL = phase_codes(np.arange(BALLS) // 6 + 1).astype(np.int64)
+N_GROUPS = 3 * N_BUCKETS
+TIE = 0.5
+# Runs still to come are tracked up to this many
+MAX_REMAINING = 400
+
+
+def _legal(ball_number):
+    # The delivery records carry no extras type, so wides and no-balls are
+    # taken to be the deliveries past the sixth of an over: they do not use up
+    # a ball. The outcome model and the match states both count balls this way.
+    return ball_number <= 6
+
+
+def _balls_bowled(over_number, ball_number):
+    return np.minimum((over_number.astype(np.int64) - 1) * 6 + np.minimum(ball_number, 6), BALLS)
+
+
+class OutcomeModel:
+    def __init__(self, store):
+        d = store.deliveries
+        self.venues = d.labels('venue')
+        # Wickets lost before each delivery, within its innings
+        fell = d['wicket'].astype(np.int64)
+        before = np.cumsum(fell) - fell
+        innings_start = np.r_[True, (np.diff(d['match_row']) != 0) | (np.diff(d['inning']) != 0)]
+        starts = np.flatnonzero(innings_start)
+        before -= np.repeat(before[starts], np.diff(np.r_[starts, len(d)]))
+        # One outcome per legal ball, as the simulation steps through the
+        # innings: the extras after a ball add their runs and wickets to it
+        balls = np.flatnonzero(_legal(d['ball_number']) | innings_start)
+        fell = np.minimum(np.add.reduceat(fell, balls), 1)
+        runs = np.add.reduceat(d['runs_total'].astype(np.int64), balls)
+        group = d['phase'][balls].astype(np.int64) * N_BUCKETS + WICKET_BUCKETS[np.minimum(before[balls], WICKETS)]
+        outcome = fell * (MAX_RUNS + 1) + np.minimum(runs, MAX_RUNS)
+        venue = d['venue'][balls].astype(np.int64)
+        keep = (d['inning'][balls] <= 2) & (venue >= 0)
+        counts = np.bincount((venue[keep] * N_GROUPS + group[keep]) * OUTCOMES + outcome[keep],
+                             minlength=len(self.venues) * N_GROUPS * OUTCOMES)
+        self.counts = counts.reshape(len(self.venues), N_GROUPS, OUTCOMES).astype(np.float64)
+        overall = self.counts.sum(axis=0)
+        self.overall = overall / np.maximum(overall.sum(axis=1, keepdims=True), 1)
+
+    def probabilities(self, venue=None):
+        code = np.flatnonzero(self.venues == venue)
+        if not len(code):
+            return self.overall
+        counts = self.counts[code[0]]
+        return (counts + PRIOR_BALLS * self.overall) / (counts.sum(axis=1, keepdims=True) + PRIOR_BALLS)
+
+    def sampler(self, venue=None):
+        # Inverse-CDF tables of the groups laid end to end: slot j of group g
+        # holds the outcome whose cumulative probability first passes j
+        cdf = np.cumsum(self.probabilities(venue), axis=1)
+        cdf[:, -1] = 1.0
+        slots = (np.arange(RESOLUTION) + 0.5) / RESOLUTION
+        return np.concatenate([np.searchsorted(row, slots, side='right') for row in cdf]).astype(np.intp)
+
+
+def get_outcome_model():
+    return get_store().derived('outcome_model', OutcomeModel)
+
+
+def _venue_seed(venue):
+    return zlib.crc32(str(venue).encode())
+
+
+class RemainingRunsCache:
+    # Remaining-runs tables of the most recently used venues, simulated once
+    # per venue and data version and shared by its matches. A venue being
+    # simulated only holds up callers waiting for that venue.
+    def __init__(self, store, max_entries=CACHED_VENUES):
+        self.model = get_outcome_model()
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            pmf = self._entries.get(key)
+            if pmf is not None:
+                self._entries.move_to_end(key)
+            return pmf
+
+    def get(self, venue, n=SIMULATIONS):
+        key = (venue, n)
+        pmf = self._cached(key)
+        if pmf is not None:
+            return pmf
+        with self._lock:
+            lock = self._building.setdefault(key, threading.Lock())
+        with lock:
+            pmf = self._cached(key)
+            if pmf is None:
+                pmf = remaining_runs(self.model.sampler(venue), n, _venue_seed(venue))
+                with self._lock:
+                    self._entries[key] = pmf
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    self._building.pop(key, None)
+        return pmf
+
+
+def get_remaining_runs(venue, n=SIMULATIONS):
+    return get_store().derived('remaining_runs', RemainingRunsCache).get(venue, n)
+
+
+def remaining_runs(sampler, n=SIMULATIONS, seed=0):
+    # Distribution of the runs still to come from every (balls bowled,
+    # wickets lost) state, from n simulated completions of the innings per
+    # state. Runs so far do not change how the rest of an innings is played,
+    # so the states are simulated backwards from the last ball, all wicket
+    # counts at once: path j draws one delivery and continues as path j of
+    # the state that delivery leads to. Paths are independent of each other,
+    # so each state's n completions are too.
+    if len(sampler) != N_GROUPS * RESOLUTION:
+        raise ValueError(f"Sampler has {len(sampler)} slots, expected {N_GROUPS * RESOLUTION}")
+    rng = np.random.default_rng(seed)
+    pmf = np.zeros((BALLS + 1, WICKETS + 1, MAX_REMAINING))
+    pmf[BALLS, :, 0] = 1.0
+    lost = np.arange(WICKETS + 1)[:, None]
+    rows = (lost * MAX_REMAINING).astype(np.intp)
+    later = np.zeros((WICKETS + 1, n), dtype=np.intp)
+    # Group offsets run up to (N_GROUPS - 1) * RESOLUTION, past int16
+    group_offsets = (np.arange(N_GROUPS) * RESOLUTION).astype(np.intp)
+    for ball in range(BALLS - 1, -1, -1):
+        offsets = group_offsets[PHASE_OF_BALL[ball] * N_BUCKETS + WICKET_BUCKETS[lost]]
+        outcome = sampler[rng.integers(0, RESOLUTION, size=(WICKETS + 1, n), dtype=np.intp) + offsets]
+        after = np.minimum(lost + OUTCOME_WICKETS[outcome], WICKETS)
+        runs = OUTCOME_RUNS[outcome] + np.take_along_axis(later, after, axis=0)
+        runs[WICKETS] = 0
+        later = np.minimum(runs, MAX_REMAINING - 1, out=runs)
+        pmf[ball] = np.bincount((later + rows).ravel(),
+                                minlength=(WICKETS + 1) * MAX_REMAINING).reshape(WICKETS + 1, MAX_REMAINING) / n
+    return pmf
+
+
+def simulate(pmf, states):
+    # Probability that the side batting first wins from each state. states
+    # holds inning, balls bowled, wickets lost, runs and (second innings) the
+    # target; a tie counts as half a win.
+    below = np.cumsum(pmf, axis=-1) - pmf
+    ball, lost, runs = states['ball'], states['lost'], states['runs']
+    first = states['inning'] == 1
+    result = np.empty(len(first))
+
+    # First innings: the chase from the first ball falls short of the total
+    # this innings reaches, or ties it
+    chase = np.r_[pmf[0, 0], np.zeros(MAX_REMAINING + runs.max(initial=0))]
+    chase_below = np.r_[below[0, 0], np.ones(MAX_REMAINING + runs.max(initial=0))]
+    totals = runs[first][:, None] + np.arange(MAX_REMAINING)
+    result[first] = (pmf[ball[first], lost[first]]
+                     * (chase_below[totals] + TIE * chase[totals])).sum(axis=1)
+
+    # Second innings: the runs still to come stop short of the first innings
+    # total, or tie it
+    short = states['target'][~first] - 1 - runs[~first]
+    at = np.clip(short, 0, MAX_REMAINING - 1)
+    chasing = (below[ball[~first], lost[~first], at] + TIE * pmf[ball[~first], lost[~first], at])
+    result[~first] = np.where(short < 0, 0.0, np.where(short >= MAX_REMAINING, 1.0, chasing))
+    return result
+
+
+def match_states(store, match_id):
+    # The state before the first ball and after every delivery of the two
+    # innings, as the worm chart numbers them
+    rows = store.match_deliveries(match_id)
+    d = store.deliveries
+    inning = d['inning'][rows]
+    rows, inning = rows[inning <= 2], inning[inning <= 2]
+    frames = []
+    first_total = 0
+    for number in (1, 2):
+        innings = rows[inning == number]
+        if number == 2 and not len(innings):
+            break
+        runs = np.r_[0, np.cumsum(d['runs_total'][innings])]
+        frames.append(pd.DataFrame({
+            'inning': number,
+            'ball_no': np.arange(len(innings) + 1),
+            'ball': np.r_[0, _balls_bowled(d['over_number'][innings], d['ball_number'][innings])],
+            'lost': np.minimum(np.r_[0, np.cumsum(d['wicket'][innings])], WICKETS),
+            'runs': runs,
+            'target': first_total + 1 if number == 2 else 0,
+        }))
+        first_total = runs[-1]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=['inning', 'ball_no', 'ball', 'lost', 'runs', 'target'])
+
+
+def batting_first(store, match_id):
+    from utils.filters import get_filter_index
+
+    rows = store.match_deliveries(match_id)
+    teams = get_filter_index().teams['batting'][rows]
+    if not len(teams):
+        return None, None
+    first = teams[0]
+    team_1, team_2 = store.matches['team_1'][store.match_row(match_id)], store.matches['team_2'][store.match_row(match_id)]
+    second = team_2 if first == team_1 else team_1
+    labels = store.matches.labels('team_1')
+    return (labels[first] if first >= 0 else None), (labels[second] if second >= 0 else None)
+
+
+def _curve(states, probabilities, teams):
+    df = states[['inning', 'ball_no', 'runs', 'lost']].rename(columns={'lost': 'wickets'})
+    df['batting_first'], df['batting_second'] = teams
+    df['win_probability'] = probabilities.round(4)
+    return df
+
+
+def _match_inputs(store, match_id):
+    states = match_states(store, match_id)
+    venue = store.matches.decode('venue', store.matches['venue'][[store.match_row(match_id)]])[0]
+    arrays = {column: states[column].to_numpy(dtype=np.int64)
+              for column in ['inning', 'ball', 'lost', 'runs', 'target']}
+    return states, venue, arrays
+
+
+@cached_result
+def win_probability(match_id, version, n=SIMULATIONS):
+    # Win probability of the side batting first, before the first ball and
+    # after every delivery of both innings. The outcome model is fitted on
+    # every match, so version is data_version(), not the match's own version.
+    store = get_store()
+    states, venue, arrays = _match_inputs(store, match_id)
+    probabilities = simulate(get_remaining_runs(venue, n), arrays)
+    return _curve(states, probabilities, batting_first(store, match_id))
+
+
+def _venue_task(sampler, n, seed, match_arrays):
+    pmf = remaining_runs(sampler, n, seed)
+    return [simulate(pmf, arrays) for arrays in match_arrays]
+
+
+def season_win_probabilities(season, workers=None, n=SIMULATIONS):
+    # Simulate a season's venues across a process pool, then store each match
+    # curve in the shared result cache under the key the match page reads
+    from utils.data_version import data_version
+
+    store = get_store()
+    model = get_outcome_model()
+    version = data_version()
+    matches = store.matches
+    by_venue = {}
+    for match_id in matches['match_id'][matches.equals('season', season)].tolist():
+        states, venue, arrays = _match_inputs(store, match_id)
+        by_venue.setdefault(venue, []).append((match_id, states, arrays))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {venue: executor.submit(_venue_task, model.sampler(venue), n, _venue_seed(venue),
+                                          [arrays for _, _, arrays in jobs])
+                   for venue, jobs in by_venue.items()}
+        for venue, jobs in by_venue.items():
+            for (match_id, states, _), probabilities in zip(jobs, futures[venue].result()):
+                curve = _curve(states, probabilities, batting_first(store, match_id))
+                win_probability.prime(curve, match_id, version, n)
+    return sum(len(jobs) for jobs in by_venue.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute win-probability curves for whole seasons")
+    parser.add_argument("seasons", nargs="*", help="seasons to simulate (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--simulations", type=int, default=SIMULATIONS)
+    args = parser.parse_args(argv)
+
+    labels = get_store().matches.labels('season')
+    seasons = [labels.dtype.type(season) for season in args.seasons] if args.seasons else labels.tolist()
+    for season in seasons:
+        started = time.perf_counter()
+        count = season_win_probabilities(season, args.workers, args.simulations)
+        print(f"{season}: {count} matches in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m utils.win_probability [season ...] [--workers N] [--simulations N]
+    sys.exit(main())